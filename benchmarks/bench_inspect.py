@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Compare container inspection strategies end to end against the fake
+Docker daemon: one `docker inspect` per container, batched CLI calls (with
+and without field projection), the Docker SDK sequentially and with a
+thread pool, and the asyncio client. All of them must yield the same
+services."""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+from fake_docker import FakeDockerDaemon
+
+from docker_inspect2compose.cli import (
+    DOCKER_SDK_AVAILABLE,
+    Inspector,
+    docker_inspect,
+    iter_services,
+)
+from docker_inspect2compose.models import INSPECT_FIELDS
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin")
+
+
+def per_container_cli() -> List[Dict[str, Any]]:
+    with Inspector("cli") as inspector:
+        listing = inspector.list_containers()
+    return [docker_inspect(entry["Id"]) for entry in listing]
+
+
+def strategies(jobs: int) -> Dict[str, Callable[[], List[Dict[str, Any]]]]:
+    def inspect_with(*args: Any) -> Callable[[], List[Dict[str, Any]]]:
+        def run() -> List[Dict[str, Any]]:
+            with Inspector(*args) as inspector:
+                return inspector.get_container_info()
+
+        return run
+
+    found = OrderedDict(
+        [
+            ("cli, per container", per_container_cli),
+            ("cli, batched", inspect_with("cli", jobs)),
+            ("cli, batched+fields", inspect_with("cli", jobs, INSPECT_FIELDS)),
+        ]
+    )  # type: Dict[str, Callable[[], List[Dict[str, Any]]]]
+    if DOCKER_SDK_AVAILABLE:
+        found["sdk, sequential"] = inspect_with("sdk", 1)
+        found[f"sdk, {jobs} threads"] = inspect_with("sdk", jobs)
+    found[f"async, {jobs} conns"] = inspect_with("async", jobs)
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--containers", type=int, default=200)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.002,
+        help="Fake daemon delay per request in seconds (default: 0.002)",
+    )
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip",
+        action="append",
+        default=[],
+        metavar="PREFIX",
+        help="Skip strategies whose name starts with PREFIX, e.g. 'cli, per'",
+    )
+    args = parser.parse_args()
+
+    if not DOCKER_SDK_AVAILABLE:
+        print("note: the Docker SDK is not installed; skipping the sdk strategies")
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "docker.sock")
+        with FakeDockerDaemon(socket_path, args.containers, args.latency) as daemon:
+            os.environ["DOCKER_HOST"] = daemon.docker_host
+            os.environ["PATH"] = BIN_DIR + os.pathsep + os.environ["PATH"]
+            print(
+                f"{args.containers} containers, {args.latency * 1000:g} ms per request"
+            )
+            print(f"{'strategy':<22} {'ms':>10} {'containers/s':>13}")
+            expected = None
+            for name, inspect in strategies(args.jobs).items():
+                if any(name.startswith(prefix) for prefix in args.skip):
+                    continue
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    documents = inspect()
+                    times.append(time.perf_counter() - start)
+                services = list(iter_services(documents, False))
+                if expected is None:
+                    expected = services
+                elif services != expected:
+                    raise SystemExit(f"error: {name} produced different services")
+                best = min(times)
+                print(f"{name:<22} {best * 1000:>10.1f} {args.containers / best:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
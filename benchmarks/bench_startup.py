@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Measure CLI startup cost using `python -X importtime` and `--help` wall time."""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+ENTRY_MODULE = "docker_inspect2compose.cli"
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    rows = []
+    for line in result.stderr.decode("utf-8").splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        try:
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            # Header line
+            continue
+    return rows
+
+
+def help_wall_times(runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", ENTRY_MODULE, "--help"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="Number of --help runs")
+    parser.add_argument(
+        "--top", type=int, default=10, help="Number of slowest imports to list"
+    )
+    args = parser.parse_args()
+
+    rows = import_times(ENTRY_MODULE)
+    total = next(cum for name, _, cum in rows if name == ENTRY_MODULE)
+    print(f"import {ENTRY_MODULE}: {total / 1000:.1f} ms cumulative")
+    print(f"slowest {args.top} imports (cumulative):")
+    for name, _, cum in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+
+    heavy = [name for name, _, _ in rows if name.split(".")[0] in ("docker", "yaml")]
+    if heavy:
+        print(f"warning: heavy modules imported at startup: {', '.join(heavy)}")
+
+    times = help_wall_times(args.runs)
+    print(
+        f"--help wall time over {args.runs} runs: "
+        f"median {statistics.median(times) * 1000:.1f} ms, "
+        f"min {min(times) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""Time and peak memory of transform_to_compose(), merge_compose(),
+write_compose() and load_existing_compose() at several sizes, compared with
+a stored baseline. Exits with status 1 if anything regressed."""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from synthetic import inspect_document
+
+from docker_inspect2compose.cli import (
+    load_existing_compose,
+    merge_compose,
+    transform_to_compose,
+    write_compose,
+)
+
+SIZES = (10, 1000, 100000)
+
+# Inspect documents are cycled from a pool of this size, so large runs
+# don't need every input document in memory at once. Service names are
+# still unique.
+DOCUMENT_POOL = 1000
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+# A result regresses when it exceeds the baseline by more than this fraction
+# and by more than the absolute floor, which keeps tiny runs from failing on
+# timer noise.
+DEFAULT_TOLERANCE = 0.25
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 64 * 1024
+
+
+def transformed(size: int, env: int = 20) -> List[Tuple[str, Dict[str, Any]]]:
+    pool = [
+        inspect_document(index, env=env) for index in range(min(size, DOCUMENT_POOL))
+    ]
+    return [
+        (
+            f"service-{index}",
+            transform_to_compose(
+                f"service-{index}", pool[index % len(pool)], False
+            )["services"][f"service-{index}"],
+        )
+        for index in range(size)
+    ]
+
+
+def setup(size: int, directory: str) -> Dict[str, Callable[[], Any]]:
+    # The callables to benchmark for one size; inputs are built up front so
+    # only the operation itself is measured.
+    pool = [inspect_document(index) for index in range(min(size, DOCUMENT_POOL))]
+    compose = OrderedDict(
+        [("version", "3.8"), ("services", OrderedDict(transformed(size)))]
+    )
+    # Every service gets two more environment variables, so the deep merge
+    # has to combine lists rather than just replacing values.
+    new_services = [
+        {"version": "3.8", "services": {name: service}}
+        for name, service in transformed(size, env=22)
+    ]
+    path = os.path.join(directory, f"compose-{size}.yml")
+    write_compose(compose, path)
+
+    def transform() -> None:
+        for index in range(size):
+            transform_to_compose(f"service-{index}", pool[index % len(pool)], False)
+
+    def merge() -> None:
+        existing = {"version": "3.8", "services": dict(compose["services"])}
+        merge_compose(existing, new_services, "deep")
+
+    return OrderedDict(
+        [
+            ("transform", transform),
+            ("merge", merge),
+            ("write", lambda: write_compose(compose, path)),
+            ("load", lambda: load_existing_compose(path)),
+        ]
+    )
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    # Best wall time of `repeat` runs, then one more run under tracemalloc
+    # for the peak memory allocated by the operation.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    found = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, floor in (
+            ("seconds", MIN_TIME_DELTA),
+            ("peak_bytes", MIN_MEMORY_DELTA),
+        ):
+            old, new = baseline[key][metric], result[metric]
+            if new > old * (1 + tolerance) and new - old > floor:
+                found.append(
+                    f"{key} {metric}: {old:.6g} -> {new:.6g} "
+                    f"(+{(new / old - 1) * 100:.0f}%)"
+                )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store these results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown or memory growth as a fraction "
+        f"(default: {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args()
+
+    baseline = {}  # type: Dict[str, Dict[str, float]]
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = OrderedDict()  # type: Dict[str, Dict[str, float]]
+    print(f"{'benchmark':<16} {'ms':>10} {'peak KiB':>10} {'vs baseline':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            for name, func in setup(size, directory).items():
+                key = f"{name}/{size}"
+                results[key] = result = measure(func, args.repeat)
+                change = ""
+                if key in baseline:
+                    ratio = result["seconds"] / baseline[key]["seconds"]
+                    change = f"{(ratio - 1) * 100:+.0f}%"
+                print(
+                    f"{key:<16} {result['seconds'] * 1000:>10.1f} "
+                    f"{result['peak_bytes'] / 1024:>10.0f} {change:>12}"
+                )
+
+    if args.save_baseline:
+        # Merge into the existing baseline so sizes can be saved separately.
+        saved = {}  # type: Dict[str, Dict[str, float]]
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; create one with --save-baseline.")
+        return
+    found = regressions(results, baseline, args.tolerance)
+    if found:
+        print(
+            f"\nREGRESSION: {len(found)} result(s) exceed the baseline by more "
+            f"than {args.tolerance:.0%}:",
+            file=sys.stderr,
+        )
+        for line in found:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
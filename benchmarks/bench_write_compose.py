@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Compare write_compose() against the old JSON round-trip serialization and
+the streaming writer, checking that all three produce identical output."""
+
+import argparse
+import io
+import json
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+import yaml
+from synthetic import inspect_document
+
+from docker_inspect2compose.cli import transform_to_compose
+from docker_inspect2compose.compose_writer import StreamingComposeWriter, dump_compose
+
+
+def compose_document(services: int) -> OrderedDict:
+    compose = OrderedDict({"version": "3.8", "services": {}})
+    for index in range(services):
+        compose["services"].update(
+            transform_to_compose(f"service-{index}", inspect_document(index), False)[
+                "services"
+            ]
+        )
+    return compose
+
+
+def json_round_trip_dump(compose_data: Dict[str, Any], stream: io.StringIO) -> None:
+    compose_data = json.loads(json.dumps(compose_data))
+    yaml.dump(compose_data, stream, default_flow_style=False, sort_keys=False)
+
+
+def streaming_dump(compose_data: Dict[str, Any], stream: io.StringIO) -> None:
+    with StreamingComposeWriter(stream) as writer:
+        for service_name, service in compose_data["services"].items():
+            writer.add_service(service_name, service)
+
+
+def measure(
+    dump: Callable[[Dict[str, Any], io.StringIO], None], compose_data: Dict[str, Any]
+) -> Tuple[float, int, str]:
+    stream = io.StringIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    dump(compose_data, stream)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, stream.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=1000)
+    args = parser.parse_args()
+
+    compose_data = compose_document(args.services)
+    old_time, old_peak, old_output = measure(json_round_trip_dump, compose_data)
+    new_time, new_peak, new_output = measure(dump_compose, compose_data)
+    stream_time, stream_peak, stream_output = measure(streaming_dump, compose_data)
+    if not old_output == new_output == stream_output:
+        raise SystemExit("error: outputs differ between serializers")
+
+    print(f"{args.services} services, {len(new_output)} bytes of YAML")
+    print(f"  json round-trip: {old_time * 1000:8.1f} ms, peak {old_peak / 1024:8.0f} KiB")
+    print(f"  direct dump:     {new_time * 1000:8.1f} ms, peak {new_peak / 1024:8.0f} KiB")
+    print(
+        f"  streaming:       {stream_time * 1000:8.1f} ms, "
+        f"peak {stream_peak / 1024:8.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
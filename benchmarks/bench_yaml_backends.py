@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Compare the libyaml C and pure-Python YAML backends on large compose files."""
+
+import argparse
+import io
+import time
+from typing import Callable, List
+
+from bench_write_compose import compose_document
+
+from docker_inspect2compose.compose_writer import (
+    LIBYAML_AVAILABLE,
+    dump_compose,
+    load_compose,
+)
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--services",
+        type=int,
+        nargs="+",
+        default=[100, 2000],
+        help="Compose document sizes to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = ["python"] + (["c"] if LIBYAML_AVAILABLE else [])  # type: List[str]
+    if not LIBYAML_AVAILABLE:
+        print("note: PyYAML was built without libyaml; only the Python backend is run")
+
+    print(f"{'services':>8}  {'backend':<7}  {'dump ms':>9}  {'load ms':>9}")
+    for services in args.services:
+        compose_data = compose_document(services)
+        text = io.StringIO()
+        dump_compose(compose_data, text, backend="python")
+        text = text.getvalue()
+        for backend in backends:
+            dump_time = best_of(
+                args.repeat,
+                lambda: dump_compose(compose_data, io.StringIO(), backend=backend),
+            )
+            load_time = best_of(
+                args.repeat, lambda: load_compose(io.StringIO(text), backend=backend)
+            )
+            print(
+                f"{services:>8}  {backend:<7}  {dump_time * 1000:>9.1f}  "
+                f"{load_time * 1000:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
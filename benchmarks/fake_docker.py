@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""A fake Docker daemon for benchmarking inspection without Docker.
+
+Serves the Engine API endpoints this tool uses (/_ping, /version,
+/containers/json, /containers/{id}/json and /events) over a unix socket,
+with synthetic containers from synthetic.py and a configurable delay per
+request. `benchmarks/bin/docker` is a matching `docker` CLI that talks to
+it, so putting that directory first on PATH exercises the CLI backend too.
+
+Run directly to serve until interrupted:
+
+    python benchmarks/fake_docker.py --containers 500 --latency 0.002
+    export DOCKER_HOST=unix:///tmp/fake-docker.sock PATH=$PWD/benchmarks/bin:$PATH
+"""
+
+import argparse
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from synthetic import inspect_document
+
+API_VERSION = "1.41"
+DEFAULT_SOCKET_PATH = "/tmp/fake-docker.sock"
+
+
+def listing_entry(document: Dict[str, Any]) -> Dict[str, Any]:
+    # The /containers/json summary of an inspect document.
+    return {
+        "Id": document["Id"],
+        "Names": [document["Name"]],
+        "Image": document["Config"]["Image"],
+        "ImageID": document["Image"],
+        "Command": " ".join([document["Path"]] + document["Args"]),
+        "Created": 1704067200,
+        "Ports": [
+            {
+                "IP": binding["HostIp"],
+                "PrivatePort": int(port.split("/")[0]),
+                "PublicPort": int(binding["HostPort"]),
+                "Type": port.split("/")[1],
+            }
+            for port, bindings in document["NetworkSettings"]["Ports"].items()
+            for binding in bindings or []
+        ],
+        "Labels": document["Config"]["Labels"],
+        "State": document["State"]["Status"],
+        "Status": "Up 2 hours (healthy)",
+        "HostConfig": {"NetworkMode": document["HostConfig"]["NetworkMode"]},
+        "NetworkSettings": {"Networks": document["NetworkSettings"]["Networks"]},
+        "Mounts": document["Mounts"],
+    }
+
+
+def matches_filters(document: Dict[str, Any], filters: Dict[str, List[str]]) -> bool:
+    # Supports the id, name and label filters of `docker ps`.
+    labels = document["Config"]["Labels"]
+    for key, values in filters.items():
+        if key == "id" and not any(document["Id"].startswith(v) for v in values):
+            return False
+        if key == "name" and not any(v in document["Name"] for v in values):
+            return False
+        if key == "label":
+            for value in values:
+                name, sep, expected = value.partition("=")
+                if name not in labels or (sep and labels[name] != expected):
+                    return False
+    return True
+
+
+def event_matches(event: Dict[str, Any], filters: Dict[str, List[str]]) -> bool:
+    # Supports the type, event and container filters of `docker events`.
+    for key, values in filters.items():
+        value = {
+            "type": event["Type"],
+            "event": event["Action"],
+            "container": event["Actor"]["ID"],
+        }.get(key)
+        if value is not None and value not in values:
+            return False
+    return True
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server = None  # type: FakeDockerDaemon
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        path = re.sub(r"^/v[0-9.]+", "", url.path)
+        query = parse_qs(url.query)
+        time.sleep(self.server.latency)
+
+        if path == "/_ping":
+            self.send_text(200, "OK")
+        elif path == "/version":
+            self.send_json(
+                200,
+                {"Version": "24.0.0", "ApiVersion": API_VERSION, "MinAPIVersion": "1.12"},
+            )
+        elif path == "/containers/json":
+            filters = json.loads(query.get("filters", ["{}"])[0])
+            all = query.get("all", ["0"])[0] not in ("0", "false")
+            self.send_json(
+                200,
+                [
+                    listing_entry(document)
+                    for document in self.server.containers.values()
+                    if (all or document["State"]["Running"])
+                    and matches_filters(document, filters)
+                ],
+            )
+        elif path == "/events":
+            self.send_events(query)
+        else:
+            match = re.match(r"^/containers/([^/]+)/json$", path)
+            document = self.server.find(unquote(match.group(1))) if match else None
+            if document is not None:
+                self.send_json(200, document)
+            elif match:
+                message = f"No such container: {unquote(match.group(1))}"
+                self.send_json(404, {"message": message})
+            else:
+                self.send_json(404, {"message": "page not found"})
+
+    def send_text(self, status: int, body: str, content_type: str = "text/plain") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Api-Version", API_VERSION)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status: int, value: Any) -> None:
+        self.send_text(status, json.dumps(value), "application/json")
+
+    def send_events(self, query: Dict[str, List[str]]) -> None:
+        # A chunked stream of the events passed to FakeDockerDaemon.emit().
+        # With `until`, the past events between `since` and `until` are sent
+        # and the stream ends; otherwise new events are sent until the server
+        # stops.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+        filters = json.loads(query.get("filters", ["{}"])[0])
+        if "until" in query:
+            since = float(query.get("since", ["0"])[0])
+            until = float(query["until"][0])
+            with self.server.changed:
+                events = list(self.server.events)
+            for event in events:
+                if since <= event["timeNano"] / 1e9 <= until and event_matches(
+                    event, filters
+                ):
+                    self.send_chunk(event)
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        seen = len(self.server.events)
+        with self.server.changed:
+            while not self.server.stopping:
+                for event in self.server.events[seen:]:
+                    if event_matches(event, filters):
+                        self.send_chunk(event)
+                self.wfile.flush()
+                seen = len(self.server.events)
+                self.server.changed.wait()
+        self.wfile.write(b"0\r\n\r\n")
+        self.close_connection = True
+
+    def send_chunk(self, event: Dict[str, Any]) -> None:
+        data = json.dumps(event).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class FakeDockerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Fake Docker Engine API on a unix socket, serving in a background
+    thread. Use as a context manager, or call start() and stop()."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        containers: int = 100,
+        latency: float = 0.0,
+        **options: int,
+    ) -> None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, FakeDockerHandler)
+        self.socket_path = socket_path
+        self.latency = latency
+        self.containers = OrderedDict(
+            (document["Id"], document)
+            for document in (inspect_document(i, **options) for i in range(containers))
+        )  # type: Dict[str, Dict[str, Any]]
+        self.names = {doc["Name"].lstrip("/"): cid for cid, doc in self.containers.items()}
+        self.events = []  # type: List[Dict[str, Any]]
+        self.changed = threading.Condition()
+        self.stopping = False
+        self.thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def docker_host(self) -> str:
+        return f"unix://{self.socket_path}"
+
+    def find(self, name_or_id: str) -> Optional[Dict[str, Any]]:
+        # Like the daemon: an exact ID or name, or a unique ID prefix.
+        container_id = self.names.get(name_or_id.lstrip("/"), name_or_id)
+        if container_id in self.containers:
+            return self.containers[container_id]
+        found = [cid for cid in self.containers if cid.startswith(name_or_id)]
+        return self.containers[found[0]] if len(found) == 1 else None
+
+    def exit_container(self, container_id: str) -> None:
+        # Marks a container as stopped, leaving it listed only with `all`.
+        state = self.containers[container_id]["State"]
+        state.update(Status="exited", Running=False, Pid=0, ExitCode=0)
+
+    def emit(self, action: str, container_id: str) -> None:
+        with self.changed:
+            self.events.append(
+                {
+                    "Type": "container",
+                    "Action": action,
+                    "Actor": {"ID": container_id, "Attributes": {}},
+                    "time": int(time.time()),
+                    "timeNano": int(time.time() * 1e9),
+                }
+            )
+            self.changed.notify_all()
+
+    def start(self) -> "FakeDockerDaemon":
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self.changed:
+            self.stopping = True
+            self.changed.notify_all()
+        self.shutdown()
+        self.server_close()
+        os.unlink(self.socket_path)
+
+    def __enter__(self) -> "FakeDockerDaemon":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    parser.add_argument("--containers", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Delay per request in seconds"
+    )
+    args = parser.parse_args()
+
+    daemon = FakeDockerDaemon(args.socket, args.containers, args.latency)
+    print(f"Serving {args.containers} containers on {daemon.docker_host}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""Generate synthetic `docker inspect` output for benchmarks.
+
+Documents have the same shape as real ones, including fields the transform
+ignores (labels, state, health checks, graph driver data), so parsing and
+projection costs are realistic. Run directly to write a JSON array usable
+with `--from-json`.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator
+
+
+def inspect_document(
+    index: int,
+    ports: int = 4,
+    mounts: int = 4,
+    env: int = 20,
+    networks: int = 2,
+    labels: int = 10,
+) -> Dict[str, Any]:
+    container_id = f"{index:064x}"
+    network_names = ["bridge"]
+    network_names += [f"net-{(index + i) % 10}" for i in range(networks - 1)]
+    return {
+        "Id": container_id,
+        "Created": "2024-01-01T00:00:00.000000000Z",
+        "Path": "/docker-entrypoint.sh",
+        "Args": ["serve", "--port", "8000"],
+        "State": {
+            "Status": "running",
+            "Running": True,
+            "Paused": False,
+            "Restarting": False,
+            "Pid": 1000 + index,
+            "ExitCode": 0,
+            "StartedAt": "2024-01-01T00:00:01.000000000Z",
+            "Health": {
+                "Status": "healthy",
+                "FailingStreak": 0,
+                "Log": [
+                    {
+                        "Start": "2024-01-01T00:00:30.000000000Z",
+                        "End": "2024-01-01T00:00:30.100000000Z",
+                        "ExitCode": 0,
+                        "Output": "ok\n",
+                    }
+                    for _ in range(5)
+                ],
+            },
+        },
+        "Image": f"sha256:{index % 50:064x}",
+        "Name": f"/service-{index}",
+        "RestartCount": 0,
+        "Driver": "overlay2",
+        "HostConfig": {
+            "Binds": [f"/srv/{index}/{i}:/data/{i}" for i in range(mounts)],
+            "NetworkMode": network_names[0],
+            "PortBindings": {
+                f"{8000 + i}/tcp": [{"HostIp": "", "HostPort": str(10000 + i)}]
+                for i in range(ports)
+            },
+            "RestartPolicy": {"Name": "on-failure", "MaximumRetryCount": 5},
+            "NanoCpus": 2000000000,
+            "Memory": 536870912,
+            "LogConfig": {"Type": "json-file", "Config": {"max-size": "10m"}},
+        },
+        "GraphDriver": {
+            "Name": "overlay2",
+            "Data": {
+                key: f"/var/lib/docker/overlay2/{container_id}/{key.lower()}"
+                for key in ("LowerDir", "MergedDir", "UpperDir", "WorkDir")
+            },
+        },
+        "Mounts": [
+            {
+                "Type": "bind",
+                "Source": f"/srv/{index}/{i}",
+                "Destination": f"/data/{i}",
+                "Mode": "",
+                "RW": True,
+                "Propagation": "rprivate",
+            }
+            for i in range(mounts)
+        ],
+        "Config": {
+            "Hostname": container_id[:12],
+            "Image": f"registry.example.com/app-{index % 50}:latest",
+            "Env": [f"VAR_{i}=value-{index}-{i}" for i in range(env)],
+            "Cmd": ["serve", "--port", "8000"],
+            "ExposedPorts": {f"{8000 + i}/tcp": {} for i in range(ports)},
+            "Labels": {
+                f"com.example.label-{i}": f"value-{index % 7}-{i}"
+                for i in range(labels)
+            },
+        },
+        "NetworkSettings": {
+            "Ports": {
+                f"{8000 + i}/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(10000 + i)}]
+                for i in range(ports)
+            },
+            "Networks": {
+                name: {
+                    "NetworkID": f"{i:064x}",
+                    "EndpointID": f"{index:032x}{i:032x}",
+                    "Gateway": f"172.{17 + i}.0.1",
+                    "IPAddress": f"172.{17 + i}.{index // 250 % 250}.{index % 250 + 2}",
+                    "IPPrefixLen": 16,
+                    "MacAddress": "02:42:ac:11:00:02",
+                }
+                for i, name in enumerate(network_names)
+            },
+        },
+    }
+
+
+def inspect_documents(count: int, **options: int) -> Iterator[Dict[str, Any]]:
+    for index in range(count):
+        yield inspect_document(index, **options)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--containers", type=int, default=100)
+    parser.add_argument("--ports", type=int, default=4)
+    parser.add_argument("--mounts", type=int, default=4)
+    parser.add_argument("--env", type=int, default=20)
+    parser.add_argument("--networks", type=int, default=2)
+    parser.add_argument("--labels", type=int, default=10)
+    parser.add_argument("--jsonl", action="store_true", help="Write JSON Lines")
+    args = parser.parse_args()
+
+    documents = inspect_documents(
+        args.containers,
+        ports=args.ports,
+        mounts=args.mounts,
+        env=args.env,
+        networks=args.networks,
+        labels=args.labels,
+    )
+    if args.jsonl:
+        for document in documents:
+            sys.stdout.write(json.dumps(document) + "\n")
+        return
+    sys.stdout.write("[")
+    for index, document in enumerate(documents):
+        sys.stdout.write(("," if index else "") + json.dumps(document))
+    sys.stdout.write("]\n")
+
+
+if __name__ == "__main__":
+    main()
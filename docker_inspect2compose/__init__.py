@@ -0,0 +1,38 @@
+from docker_inspect2compose.models import (
+    ContainerSpec,
+    Mount,
+    PortBinding,
+    ServiceSpec,
+)
+
+__all__ = [
+    "ContainerSpec",
+    "Inspector",
+    "Mount",
+    "PortBinding",
+    "ServiceSpec",
+    "get_container_info",
+    "iter_container_info",
+    "merge_compose",
+    "transform_to_compose",
+    "write_compose",
+]
+
+_CLI_EXPORTS = (
+    "Inspector",
+    "get_container_info",
+    "iter_container_info",
+    "merge_compose",
+    "transform_to_compose",
+    "write_compose",
+)
+
+
+def __getattr__(name):
+    # Loaded on first access so that running the `cli` module directly
+    # doesn't import it twice.
+    if name in _CLI_EXPORTS:
+        from docker_inspect2compose import cli
+
+        return getattr(cli, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from docker_inspect2compose import stats
+from docker_inspect2compose.errors import BackendUnavailableError
+
+DEFAULT_SOCKET_PATH = "/var/run/docker.sock"
+
+# Number of keep-alive connections requests are spread across. Requests on
+# each connection are pipelined, so this only needs to be small.
+DEFAULT_CONNECTIONS = 4
+
+# Maximum number of requests in flight on one connection. The requests are
+# a few hundred bytes each, so this many always fit in the socket buffers.
+PIPELINE_DEPTH = 32
+
+
+class EngineAPIError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class ContainerNotFound(EngineAPIError):
+    pass
+
+
+def socket_path_from_env() -> str:
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if not docker_host:
+        return DEFAULT_SOCKET_PATH
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://") :]
+    # Falling back to the local socket would silently export a different
+    # daemon's containers than the one configured.
+    raise BackendUnavailableError(
+        "The async backend only supports unix:// DOCKER_HOST values, "
+        f"not {docker_host}."
+    )
+
+
+class _Connection:
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    def send(self, path: str) -> None:
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: docker\r\nConnection: keep-alive\r\n\r\n".encode(
+                "ascii"
+            )
+        )
+
+    async def receive_head(self) -> Tuple[int, Dict[str, str]]:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Docker daemon closed the connection")
+        status = int(status_line.split(b" ", 2)[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def receive_chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("Docker daemon closed the connection")
+            size = int(line.split(b";")[0], 16)
+            if size == 0:
+                # Skip any trailers up to the terminating blank line.
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            chunk = await self.reader.readexactly(size)
+            await self.reader.readline()
+            yield chunk
+
+    async def receive(self) -> Tuple[int, bytes]:
+        status, headers = await self.receive_head()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b"".join([chunk async for chunk in self.receive_chunks()])
+        else:
+            body = await self.reader.readexactly(
+                int(headers.get("content-length", "0"))
+            )
+        return status, body
+
+    async def close(self) -> None:
+        # Waiting for the transport to close releases the socket now rather
+        # than when the loop is garbage collected (a ResourceWarning).
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class AsyncDockerClient:
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        connections: int = DEFAULT_CONNECTIONS,
+    ) -> None:
+        self.socket_path = socket_path or socket_path_from_env()
+        self.connections = max(connections, 1)
+        self._pool = []  # type: List[_Connection]
+
+    async def __aenter__(self) -> "AsyncDockerClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        pool, self._pool = self._pool, []
+        for conn in pool:
+            await conn.close()
+
+    async def _connection(self, index: int) -> _Connection:
+        while len(self._pool) <= index:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            self._pool.append(_Connection(reader, writer))
+        return self._pool[index]
+
+    async def _pipeline(
+        self, index: int, paths: List[str], latency: Optional[str] = None
+    ) -> List[Any]:
+        # With `latency`, the time from sending each request to receiving
+        # its response is recorded under that stats name.
+        conn = await self._connection(index)
+        # At most PIPELINE_DEPTH requests are outstanding, topped up as each
+        # response arrives. Writing them all up front deadlocks once the
+        # daemon blocks sending responses we haven't read while we block
+        # sending requests it hasn't read.
+        sent = 0
+        sent_at = []  # type: List[float]
+        responses = []  # type: List[Tuple[int, bytes]]
+        while len(responses) < len(paths):
+            while sent < len(paths) and sent - len(responses) < PIPELINE_DEPTH:
+                conn.send(paths[sent])
+                sent_at.append(time.perf_counter())
+                sent += 1
+            await conn.writer.drain()
+            # Responses come back in request order, so all of them must be
+            # read before raising to leave the connection usable.
+            responses.append(await conn.receive())
+            if latency is not None:
+                elapsed = time.perf_counter() - sent_at[len(responses) - 1]
+                stats.observe(latency, elapsed)
+        results = []
+        for path, (status, body) in zip(paths, responses):
+            if status == 404:
+                raise ContainerNotFound(status, _error_message(body))
+            if status >= 400:
+                raise EngineAPIError(status, _error_message(body))
+            stats.add("bytes_parsed", len(body))
+            results.append(json.loads(body.decode("utf-8")))
+        return results
+
+    async def get(self, path: str, latency: Optional[str] = None) -> Any:
+        return (await self._pipeline(0, [path], latency))[0]
+
+    async def get_many(
+        self, paths: List[str], latency: Optional[str] = None
+    ) -> List[Any]:
+        if not paths:
+            return []
+        # Round-robin the paths across connections, then restore the
+        # original order from the per-connection results.
+        count = min(self.connections, len(paths))
+        batches = [paths[i::count] for i in range(count)]
+        # Wait for every connection's responses before raising, so none is
+        # left mid-read when the next request reuses it.
+        results = await asyncio.gather(
+            *(self._pipeline(i, batch, latency) for i, batch in enumerate(batches)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        ordered = [None] * len(paths)  # type: List[Any]
+        for i, batch_results in enumerate(results):
+            ordered[i::count] = batch_results
+        return ordered
+
+    async def list_containers(
+        self, all: bool = False, filters: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        query = {}  # type: Dict[str, str]
+        if all:
+            query["all"] = "1"
+        if filters:
+            query["filters"] = json.dumps(filters)
+        path = "/containers/json"
+        if query:
+            path += "?" + urlencode(query)
+        return await self.get(path)
+
+    async def events(
+        self,
+        since: Optional[float] = None,
+        filters: Optional[Dict[str, List[str]]] = None,
+        until: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Without `until` the event stream never ends, so it gets its own
+        # connection rather than one from the pool.
+        query = {}  # type: Dict[str, str]
+        if since is not None:
+            query["since"] = str(since)
+        if until is not None:
+            query["until"] = str(until)
+        if filters:
+            query["filters"] = json.dumps(filters)
+        path = "/events" + ("?" + urlencode(query) if query else "")
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        conn = _Connection(reader, writer)
+        try:
+            conn.send(path)
+            await writer.drain()
+            status, headers = await conn.receive_head()
+            if status >= 400:
+                body = await reader.read(int(headers.get("content-length", "0")))
+                raise EngineAPIError(status, _error_message(body))
+            buffer = b""
+            async for chunk in conn.receive_chunks():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line.decode("utf-8"))
+        finally:
+            await conn.close()
+
+    async def inspect_container(self, container_id: str) -> Dict[str, Any]:
+        return await self.get(
+            f"/containers/{quote(container_id, safe='')}/json", latency="inspect"
+        )
+
+    async def inspect_containers(
+        self, container_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        return await self.get_many(
+            [f"/containers/{quote(cid, safe='')}/json" for cid in container_ids],
+            latency="inspect",
+        )
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        return json.loads(body.decode("utf-8"))["message"]
+    except (ValueError, KeyError, TypeError):
+        return body.decode("utf-8", "replace").strip()
+
+
+def iter_events(
+    since: Optional[float] = None,
+    filters: Optional[Dict[str, List[str]]] = None,
+    socket_path: Optional[str] = None,
+    until: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    loop = asyncio.new_event_loop()
+    events = AsyncDockerClient(socket_path).events(since, filters, until)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
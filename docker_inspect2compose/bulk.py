@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import argparse
+import glob
+import logging
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from docker_inspect2compose.cli import (
+    iter_inspect_file,
+    iter_services,
+    write_streaming_compose,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+DEFAULT_PATTERN = "*.json*"
+
+# Extensions stripped from dump file names to get the host name.
+INPUT_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+
+def output_path_for(input_path: str, output_dir: str) -> str:
+    # web01.dc1.json -> web01.dc1.yml; dots in host names are kept.
+    host = os.path.basename(input_path)
+    for suffix in INPUT_SUFFIXES:
+        if host.endswith(suffix) and len(host) > len(suffix):
+            host = host[: -len(suffix)]
+            break
+    return os.path.join(output_dir, f"{host}.yml")
+
+
+def check_output_paths(work: List[Tuple[str, str, bool]]) -> None:
+    # Two inputs writing the same file would silently overwrite each other.
+    seen = {}  # type: Dict[str, str]
+    for input_path, output_path, _ in work:
+        if output_path in seen:
+            raise ValueError(
+                f"{seen[output_path]} and {input_path} would both be written "
+                f"to {output_path}"
+            )
+        seen[output_path] = input_path
+
+
+def convert_file(
+    job: Tuple[str, str, bool]
+) -> Tuple[str, Optional[int], Optional[str]]:
+    # Runs in a worker process. Errors are returned rather than raised so
+    # that one bad snapshot doesn't abort the whole batch.
+    input_path, output_path, include_path_env = job
+    try:
+        count = write_streaming_compose(
+            iter_services(iter_inspect_file(input_path), include_path_env),
+            output_path,
+        )
+        return input_path, count, None
+    except Exception as e:
+        return input_path, None, f"{type(e).__name__}: {e}"
+
+
+def convert_many(
+    input_paths: List[str],
+    output_dir: str,
+    include_path_env: bool = False,
+    jobs: Optional[int] = None,
+) -> List[Tuple[str, Optional[int], Optional[str]]]:
+    from concurrent.futures import ProcessPoolExecutor
+
+    work = [
+        (path, output_path_for(path, output_dir), include_path_env)
+        for path in input_paths
+    ]
+    check_output_paths(work)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return [convert_file(job) for job in work]
+    # Batch small snapshots per task to keep IPC overhead low.
+    chunksize = max(1, len(work) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(convert_file, work, chunksize=chunksize))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert a directory of per-host `docker inspect` dumps into "
+        "one Docker Compose file per host, in parallel."
+    )
+    parser.add_argument("input_dir", help="Directory containing inspect JSON dumps")
+    parser.add_argument(
+        "--output-dir",
+        "-o",
+        required=True,
+        help="Directory to write <host>.yml compose files to.",
+    )
+    parser.add_argument(
+        "--pattern",
+        default=DEFAULT_PATTERN,
+        help=f"Glob pattern selecting dump files in input_dir (default: {DEFAULT_PATTERN}).",
+    )
+    parser.add_argument(
+        "--include-path-env",
+        action="store_true",
+        help="Include the PATH environment variable in the output",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    args = parser.parse_args()
+
+    input_paths = sorted(glob.glob(os.path.join(args.input_dir, args.pattern)))
+    if not input_paths:
+        logging.error(f"No files matching {args.pattern} found in {args.input_dir}.")
+        sys.exit(1)
+
+    try:
+        results = convert_many(
+            input_paths, args.output_dir, args.include_path_env, args.jobs
+        )
+    except ValueError as e:
+        logging.error(f"Cannot convert {args.input_dir}: {e}.")
+        sys.exit(1)
+    failures = [(path, error) for path, _, error in results if error]
+    for path, error in failures:
+        logging.error(f"Failed to convert {path}: {error}")
+    logging.info(
+        f"Converted {len(results) - len(failures)} of {len(results)} host snapshot(s)."
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
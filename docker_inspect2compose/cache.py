@@ -0,0 +1,124 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional
+
+# Fields of a container listing entry that change without the container's
+# configuration changing (e.g. "Up 3 hours").
+VOLATILE_LISTING_FIELDS = ("Status", "RunningFor")
+
+# Default number of seconds a cached service is trusted before the container
+# is inspected again.
+DEFAULT_TTL = 3600.0
+
+# Bumped whenever the table layout changes; older caches are discarded.
+SCHEMA_VERSION = 2
+
+
+def fingerprint(listing_entry: Dict[str, Any], include_path_env: bool) -> str:
+    """Hash of a /containers/json (or `docker ps`) entry.
+
+    The entry carries the container ID, creation time, state, image, names,
+    ports, mounts and networks, so a container that is recreated, restarted
+    with different settings, renamed or reconnected gets a new fingerprint.
+    Settings changed with `docker update` (restart policy, memory, CPUs)
+    are not in the listing; those are caught by `update` events and the TTL.
+    """
+    stable = {
+        key: value
+        for key, value in listing_entry.items()
+        if key not in VOLATILE_LISTING_FIELDS
+    }
+    stable["include_path_env"] = include_path_env
+    encoded = json.dumps(stable, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SnapshotCache:
+    """SQLite store of transformed services keyed on container fingerprints.
+
+    Entries older than `ttl` seconds are treated as misses, and the time of
+    the last sync is kept so callers can invalidate containers changed since.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL) -> None:
+        self.conn = sqlite3.connect(path)
+        self.ttl = ttl
+        self.now = time.time()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS services")
+            self.conn.execute("DROP TABLE IF EXISTS meta")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS services ("
+            "container_id TEXT PRIMARY KEY, "
+            "fingerprint TEXT NOT NULL, "
+            "compose TEXT NOT NULL, "
+            "checked_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, container_id: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT compose FROM services "
+            "WHERE container_id = ? AND fingerprint = ? AND checked_at >= ?",
+            (container_id, key, self.now - self.ttl),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, container_id: str, key: str, compose: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO services "
+            "(container_id, fingerprint, compose, checked_at) VALUES (?, ?, ?, ?)",
+            (container_id, key, json.dumps(compose), self.now),
+        )
+
+    def invalidate(self, container_ids: Iterable[str]) -> None:
+        self.conn.executemany(
+            "DELETE FROM services WHERE container_id = ?",
+            ((i,) for i in container_ids),
+        )
+
+    @property
+    def last_sync(self) -> Optional[float]:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'last_sync'"
+        ).fetchone()
+        return float(row[0]) if row is not None else None
+
+    @last_sync.setter
+    def last_sync(self, value: float) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_sync', ?)",
+            (repr(value),),
+        )
+
+    def prune(self, keep_ids: Iterable[str]) -> None:
+        # Drop entries for containers that no longer exist.
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM keep")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO keep (id) VALUES (?)", ((i,) for i in keep_ids)
+        )
+        self.conn.execute(
+            "DELETE FROM services WHERE container_id NOT IN (SELECT id FROM keep)"
+        )
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "SnapshotCache":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -1,28 +1,87 @@
 #!/usr/bin/env python
 
 import argparse
+import fnmatch
+import hashlib
+import importlib.util
+import itertools
 import logging
 import os
+import stat
 import sys
-from typing import Dict, Any, List, Optional
+import time
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Any,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from collections import OrderedDict
 
-try:
-    import docker
-    from docker.errors import NotFound, APIError, DockerException
+import json
 
-    DOCKER_SDK_AVAILABLE = True
-except ImportError:
-    DOCKER_SDK_AVAILABLE = False
+from docker_inspect2compose import stats
+from docker_inspect2compose.errors import BackendUnavailableError
 
-import yaml
-import subprocess
-import json
+if TYPE_CHECKING:
+    import docker
+
+# Heavy modules (the docker SDK, yaml, asyncio, subprocess) are imported on
+# the code paths that need them, so `--help` and offline runs start quickly.
+DOCKER_SDK_AVAILABLE = importlib.util.find_spec("docker") is not None
 
 logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
 
+# Conservative cap on the total length of container IDs passed to a single
+# `docker inspect` invocation, well under typical ARG_MAX limits.
+MAX_INSPECT_ARGS_LENGTH = 64 * 1024
+
+# Size of each read when streaming inspect documents from files or stdin.
+INSPECT_READ_CHUNK_SIZE = 64 * 1024
+
+# Default number of concurrent inspect requests made through the Docker SDK.
+DEFAULT_JOBS = 8
+
+# How --add-to treats services that already exist in the target file.
+MERGE_STRATEGIES = ("add", "replace", "deep")
+
+# Ways of talking to the Docker daemon; "auto" prefers the SDK when installed.
+BACKENDS = ("auto", "sdk", "cli", "async")
+
+
+class _NeverRaised(Exception):
+    pass
+
+
+class ContainerNotFoundError(LookupError):
+    pass
+
+
+class AmbiguousContainerError(ContainerNotFoundError):
+    # An ID prefix shared by several containers, none named exactly that.
+    pass
+
+
+class OutputOutOfDateError(Exception):
+    pass
+
+
+def lazy_error(module: str, name: str) -> type:
+    # An exception class from a lazily imported module. If the module was
+    # never imported, nothing could have raised it, so return a placeholder.
+    loaded = sys.modules.get(module)
+    return getattr(loaded, name) if loaded is not None else _NeverRaised
+
 
 def run_command(command: str) -> str:
+    import subprocess
+
     result = subprocess.run(
         command, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
     )
@@ -35,143 +94,936 @@ def docker_inspect(container_id: str) -> Dict[str, Any]:
     return json.loads(output)[0]
 
 
-def get_container_info(container_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    if DOCKER_SDK_AVAILABLE:
-        try:
-            client = docker.from_env()
-            if container_id:
-                containers = [client.containers.get(container_id)]
+def chunk_container_ids(
+    container_ids: List[str], max_length: int = MAX_INSPECT_ARGS_LENGTH
+) -> List[List[str]]:
+    chunks = []
+    chunk = []
+    chunk_length = 0
+    for cid in container_ids:
+        if chunk and chunk_length + len(cid) + 1 > max_length:
+            chunks.append(chunk)
+            chunk = []
+            chunk_length = 0
+        chunk.append(cid)
+        chunk_length += len(cid) + 1
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def inspect_template(fields: Dict[str, Any], path: str = "") -> str:
+    # A `docker inspect --format` Go template that renders only `fields`
+    # (see models.INSPECT_FIELDS) as a JSON object.
+    return (
+        "{"
+        + ",".join(
+            f"{json.dumps(key)}:"
+            + (
+                f"{{{{json {path}.{key}}}}}"
+                if value is None
+                else inspect_template(value, f"{path}.{key}")
+            )
+            for key, value in fields.items()
+        )
+        + "}"
+    )
+
+
+def iter_docker_inspect(
+    container_ids: List[str], fields: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    import subprocess
+
+    # One `docker inspect` process per chunk rather than per container, in
+    # the same order as its arguments. With `fields`, the CLI renders only
+    # those keys (one JSON object per line), so large values the transform
+    # never reads, such as GraphDriver, State.Health.Log and labels, are
+    # neither sent to nor parsed by Python.
+    command = ["docker", "inspect", "--type", "container"]
+    if fields is not None:
+        command += ["--format", inspect_template(fields)]
+    for chunk in chunk_container_ids(container_ids):
+        start = time.perf_counter()
+        result = subprocess.run(
+            command + chunk,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        elapsed = time.perf_counter() - start
+        stats.add("bytes_parsed", len(result.stdout))
+        output = result.stdout.decode("utf-8")
+        if fields is None:
+            documents = json.loads(output)
+        else:
+            documents = [
+                json.loads(line) for line in output.splitlines() if line.strip()
+            ]
+        # One process inspects the whole chunk, so each document is charged
+        # an equal share of its run time.
+        for _ in documents:
+            stats.observe("inspect", elapsed / len(documents))
+        yield from documents
+
+
+def timed_inspect(client: "docker.DockerClient", container_id: str) -> Dict[str, Any]:
+    # Records each request's own round trip, as the workers overlap.
+    start = time.perf_counter()
+    document = client.api.inspect_container(container_id)
+    stats.observe("inspect", time.perf_counter() - start)
+    return document
+
+
+def iter_inspect_concurrently(
+    client: "docker.DockerClient", container_ids: List[str], jobs: int
+) -> Iterator[Dict[str, Any]]:
+    if jobs <= 1 or len(container_ids) <= 1:
+        for cid in container_ids:
+            yield timed_inspect(client, cid)
+        return
+    import functools
+    from concurrent.futures import ThreadPoolExecutor
+
+    # executor.map yields results in submission order, so the output stays
+    # deterministic regardless of which inspect finishes first.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(functools.partial(timed_inspect, client), container_ids)
+
+
+def resolve_backend(backend: str) -> str:
+    if backend == "auto":
+        return "sdk" if DOCKER_SDK_AVAILABLE else "cli"
+    if backend == "sdk" and not DOCKER_SDK_AVAILABLE:
+        raise BackendUnavailableError("The Docker SDK for Python is not installed.")
+    return backend
+
+
+# Negotiated Docker API versions by DOCKER_HOST, so that clients created
+# after the first one skip the /version round trip.
+_API_VERSIONS = {}  # type: Dict[str, str]
+
+
+def sdk_client(jobs: int = DEFAULT_JOBS) -> "docker.DockerClient":
+    import docker
+
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    client = docker.from_env(
+        max_pool_size=max(jobs, 1), version=_API_VERSIONS.get(docker_host)
+    )
+    _API_VERSIONS[docker_host] = client.api.api_version
+    return client
+
+
+def parse_filters(filters: Optional[List[str]]) -> Dict[str, List[str]]:
+    # ["label=env=prod", "name=web"] -> {"label": ["env=prod"], "name": ["web"]}
+    parsed = OrderedDict()  # type: Dict[str, List[str]]
+    for item in filters or []:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Invalid filter {item!r}, expected KEY=VALUE")
+        parsed.setdefault(key, []).append(value)
+    return parsed
+
+
+def resolve_containers(
+    patterns: List[str], listing: List[Dict[str, Any]], all: bool = True
+) -> List[str]:
+    # Container IDs matching each pattern, in pattern order then listing
+    # order, without duplicates. Without `all`, globs only match running
+    # containers; names and IDs match whatever the state.
+    containers = [(entry["Id"], entry_names(entry)) for entry in listing]
+    running = [
+        container
+        for container, entry in zip(containers, listing)
+        if entry.get("State") == "running"
+    ]
+    resolved = OrderedDict()  # type: OrderedDict
+    for pattern in patterns:
+        matched = match_containers(
+            pattern, running if is_glob(pattern) and not all else containers
+        )
+        resolved.update((container_id, None) for container_id in matched)
+    return list(resolved)
+
+
+class Inspector:
+    """Lists and inspects containers over one long-lived daemon connection.
+
+    The Docker SDK client (or the asyncio client and its event loop) is
+    created on first use and reused for every call until `close()`, so
+    repeated lookups don't pay for connection setup or API version
+    negotiation. Can be used as a context manager.
+    """
+
+    def __init__(
+        self,
+        backend: str = "auto",
+        jobs: int = DEFAULT_JOBS,
+        fields: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        # `fields` limits inspect documents from the docker CLI to the given
+        # keys (e.g. models.INSPECT_FIELDS); the API backends return the
+        # full document, which is only parsed once either way.
+        self.backend = resolve_backend(backend)
+        self.jobs = jobs
+        self.fields = fields
+        self._client = None  # type: Any
+        self._loop = None  # type: Any
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            if self.backend == "sdk":
+                self._client = sdk_client(self.jobs)
+            elif self.backend == "async":
+                import asyncio
+
+                from docker_inspect2compose.aioclient import AsyncDockerClient
+
+                self._loop = asyncio.new_event_loop()
+                self._client = AsyncDockerClient(connections=self.jobs)
+        return self._client
+
+    def _run(self, coroutine: Any) -> Any:
+        return self._loop.run_until_complete(coroutine)
+
+    def close(self) -> None:
+        if self._client is not None:
+            if self._loop is not None:
+                # The async client's sockets are closed on its own loop.
+                self._run(self._client.close())
             else:
-                containers = client.containers.list()
-            return [container.attrs for container in containers]
-        except DockerException as e:
-            logging.error(f"Docker exception occurred: {e}")
-            sys.exit(1)
-    else:
+                self._client.close()
+            self._client = None
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self) -> "Inspector":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def list_containers(
+        self, all: bool = False, filters: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        # Summary entries for running (or with `all`, every) container
+        # matching `filters`, as returned by /containers/json (or `docker ps`),
+        # each with at least an "Id" key. Filtering is done by the daemon.
+        with stats.phase("inspect"):
+            return self._list_containers(all, filters)
+
+    def _list_containers(
+        self, all: bool, filters: Optional[Dict[str, List[str]]]
+    ) -> List[Dict[str, Any]]:
+        if self.backend == "async":
+            return self._run(self.client.list_containers(all, filters))
+        if self.backend == "sdk":
+            return [
+                c.attrs
+                for c in self.client.containers.list(
+                    all=all, filters=filters, sparse=True
+                )
+            ]
+        import subprocess
+
+        command = ["docker", "ps", "--no-trunc", "--format", "{{json .}}"]
+        if all:
+            command.append("--all")
+        for key, values in (filters or {}).items():
+            command += [
+                arg for value in values for arg in ("--filter", f"{key}={value}")
+            ]
+        output = subprocess.run(
+            command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ).stdout.decode("utf-8")
+        containers = []
+        for line in output.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                entry["Id"] = entry["ID"]
+                containers.append(entry)
+        return containers
+
+    def inspect(self, container_id: str) -> Dict[str, Any]:
+        if self.backend == "async":
+            # The client records the request's latency itself.
+            with stats.phase("inspect"):
+                return self._run(self.client.inspect_container(container_id))
+        with stats.timed("inspect"):
+            if self.backend == "sdk":
+                return self.client.containers.get(container_id).attrs
+            return docker_inspect(container_id)
+
+    def iter_inspect(self, container_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        yield from stats.iterate("inspect", self._iter_inspect(container_ids))
+
+    def _iter_inspect(self, container_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        if not container_ids:
+            return
+        if self.backend == "async":
+            yield from self._run(self.client.inspect_containers(container_ids))
+        elif self.backend == "sdk":
+            yield from iter_inspect_concurrently(self.client, container_ids, self.jobs)
+        else:
+            yield from iter_docker_inspect(container_ids, self.fields)
+
+    def iter_container_info(
+        self,
+        container_id: Optional[Union[str, List[str]]] = None,
+        all: bool = False,
+        filters: Optional[Dict[str, List[str]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        # Yields inspect documents in listing order as soon as each is
+        # available, so callers can start writing output before every
+        # container is inspected. `container_id` may be a list of names, ID
+        # prefixes and globs, which are resolved against a single listing and
+        # then inspected as one batch. Containers given by name or ID are
+        # included whatever their state, globs only match stopped containers
+        # with `all`, and `filters` always apply.
+        if isinstance(container_id, list):
+            if len(container_id) == 1 and not is_glob(container_id[0]) and not filters:
+                container_id = container_id[0]
+            elif container_id:
+                # Named containers may be stopped, so list everything unless
+                # there are only globs.
+                listing = self.list_containers(
+                    all or not all_globs(container_id), filters
+                )
+                yield from self.iter_inspect(
+                    resolve_containers(container_id, listing, all)
+                )
+                return
+            else:
+                container_id = None
         if container_id:
-            return [docker_inspect(container_id)]
+            yield self.inspect(container_id)
+            return
+        # A sparse listing only hits /containers/json; the full inspect
+        # documents are then fetched in parallel.
+        listing = self.list_containers(all, filters)
+        yield from self.iter_inspect([c["Id"] for c in listing])
+
+    def get_container_info(
+        self,
+        container_id: Optional[Union[str, List[str]]] = None,
+        all: bool = False,
+        filters: Optional[Dict[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        return list(self.iter_container_info(container_id, all, filters))
+
+    def iter_events(
+        self,
+        since: Optional[float] = None,
+        filters: Optional[Dict[str, List[str]]] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        # Events from the Docker /events stream, decoded to dicts in the
+        # Engine API format (`docker events --format '{{json .}}'` matches).
+        # Without `until`, this blocks waiting for new events indefinitely.
+        if self.backend == "async":
+            # The event stream can block, so it runs on its own loop rather
+            # than the inspector's.
+            from docker_inspect2compose.aioclient import iter_events
+
+            yield from iter_events(since, filters, until=until)
+        elif self.backend == "sdk":
+            yield from self.client.events(
+                since=since, until=until, filters=filters, decode=True
+            )
         else:
-            output = run_command("docker ps -q")
-            container_ids = output.split()
-            return [docker_inspect(cid) for cid in container_ids]
+            import subprocess
+
+            command = ["docker", "events", "--format", "{{json .}}"]
+            if since is not None:
+                command += ["--since", str(since)]
+            if until is not None:
+                command += ["--until", str(until)]
+            for key, values in (filters or {}).items():
+                command += [
+                    arg for value in values for arg in ("--filter", f"{key}={value}")
+                ]
+            with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+                try:
+                    for line in process.stdout:
+                        if line.strip():
+                            yield json.loads(line.decode("utf-8"))
+                    returncode = process.wait()
+                finally:
+                    # Still running if the caller stopped reading early.
+                    if process.returncode is None:
+                        process.terminate()
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, command)
+
+
+def iter_container_info(
+    container_id: Optional[Union[str, List[str]]] = None,
+    jobs: int = DEFAULT_JOBS,
+    backend: str = "auto",
+    all: bool = False,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    with Inspector(backend, jobs) as inspector:
+        yield from inspector.iter_container_info(container_id, all, filters)
+
+
+def get_container_info(
+    container_id: Optional[Union[str, List[str]]] = None,
+    jobs: int = DEFAULT_JOBS,
+    backend: str = "auto",
+    all: bool = False,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> List[Dict[str, Any]]:
+    with Inspector(backend, jobs) as inspector:
+        return inspector.get_container_info(container_id, all, filters)
+
+
+def iter_inspect_json(
+    f: IO[str], chunk_size: int = INSPECT_READ_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    # Yields inspect documents one at a time from a single document, one or
+    # more concatenated `docker inspect` JSON arrays, or JSON Lines, reading
+    # only as much input as is needed to decode the next document.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos == len(buffer):
+            buffer = f.read(chunk_size)
+            pos = 0
+            stats.add("bytes_parsed", len(buffer))
+            if not buffer:
+                return
+            continue
+        try:
+            document, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Grow the read geometrically so that decoding a large document
+            # split across many chunks stays linear.
+            more = f.read(max(chunk_size, len(buffer) - pos))
+            eof = not more
+            stats.add("bytes_parsed", len(more))
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield document
+
+
+def iter_inspect_file(source: str) -> Iterator[Dict[str, Any]]:
+    with open(source, "r") if source != "-" else sys.stdin as f:
+        yield from iter_inspect_json(f)
+
+
+def is_glob(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
+
+
+def all_globs(patterns: List[str]) -> bool:
+    return all(is_glob(pattern) for pattern in patterns)
+
+
+def matches_exactly(pattern: str, container_id: str, names: List[str]) -> bool:
+    # A glob matched against names, or a full ID or exact name.
+    if is_glob(pattern):
+        return any(fnmatch.fnmatchcase(name, pattern) for name in names)
+    return container_id == pattern or pattern in names
+
+
+def match_containers(
+    pattern: str, containers: List[Tuple[str, List[str]]]
+) -> List[str]:
+    # IDs of the (id, names) pairs matching `pattern`. A glob matches names;
+    # otherwise, like Docker, a full ID wins over an exact name, which wins
+    # over an ID prefix, and the prefix must be unique.
+    pattern = pattern.lstrip("/")
+    if is_glob(pattern):
+        matched = [
+            container_id
+            for container_id, names in containers
+            if matches_exactly(pattern, container_id, names)
+        ]
+    else:
+        matched = [cid for cid, _ in containers if cid == pattern] or [
+            cid for cid, names in containers if pattern in names
+        ]
+        if not matched:
+            matched = [cid for cid, _ in containers if cid.startswith(pattern)]
+            if len(matched) > 1:
+                raise AmbiguousContainerError(pattern)
+    if not matched:
+        raise ContainerNotFoundError(pattern)
+    return matched
+
+
+def entry_names(entry: Dict[str, Any]) -> List[str]:
+    # Names of a listing entry (a list from the API, or a comma-separated
+    # string from `docker ps`) or an inspect document, without leading "/".
+    names = entry.get("Names", entry.get("Name", []))
+    if isinstance(names, str):
+        names = names.split(",")
+    return [name.lstrip("/") for name in names]
+
+
+def select_containers(
+    containers_info: Iterable[Dict[str, Any]],
+    container_ids: Optional[Union[str, List[str]]],
+) -> Iterator[Dict[str, Any]]:
+    # Streams the documents matching `container_ids` as resolve_containers()
+    # would select them from a listing. Whether an ID prefix is unique (and
+    # not also someone's name) is only known at the end of the input, so
+    # from the first document matched only by a prefix onwards, matches are
+    # held back until then.
+    if isinstance(container_ids, str):
+        container_ids = [container_ids]
+    if not container_ids:
+        yield from containers_info
+        return
+    patterns = [pattern.lstrip("/") for pattern in container_ids]
+    matched = set()
+    prefix_matches = OrderedDict()  # type: Dict[str, List[str]]
+    held = []  # type: List[Tuple[Dict[str, Any], bool]]
+    for inspect_data in containers_info:
+        container_id = inspect_data.get("Id", "")
+        names = entry_names(inspect_data)
+        exact = [
+            pattern
+            for pattern in patterns
+            if matches_exactly(pattern, container_id, names)
+        ]
+        prefixed = [
+            pattern
+            for pattern in patterns
+            if not is_glob(pattern)
+            and pattern not in exact
+            and container_id.startswith(pattern)
+        ]
+        matched.update(exact)
+        for pattern in prefixed:
+            prefix_matches.setdefault(pattern, []).append(container_id)
+        if not exact and not prefixed:
+            continue
+        if held or not exact:
+            held.append((inspect_data, bool(exact)))
+        else:
+            yield inspect_data
+    selected = set()
+    for pattern in patterns:
+        if pattern in matched:
+            continue
+        candidates = prefix_matches.get(pattern, [])
+        if len(candidates) > 1:
+            raise AmbiguousContainerError(pattern)
+        if not candidates:
+            raise ContainerNotFoundError(pattern)
+        selected.update(candidates)
+    for inspect_data, is_exact in held:
+        if is_exact or inspect_data.get("Id", "") in selected:
+            yield inspect_data
 
 
 def transform_to_compose(
     service_name: str, inspect_data: Dict[str, Any], include_path_env: bool
 ) -> OrderedDict:
-    def get_ports() -> List[str]:
-        ports = inspect_data["NetworkSettings"]["Ports"]
-        return [
-            f"{host_port['HostPort']}:{container_port.split('/')[0]}"
-            for container_port, host_ports in ports.items()
-            if host_ports is not None
-            for host_port in host_ports
-        ]
+    from docker_inspect2compose.models import ContainerSpec, ServiceSpec
 
-    def get_volumes() -> List[str]:
-        return [
-            f"{mount['Source']}:{mount['Destination']}"
-            for mount in inspect_data["Mounts"]
+    service = ServiceSpec.from_container(
+        ContainerSpec.from_inspect(inspect_data), include_path_env, service_name
+    )
+    return OrderedDict(
+        {"version": "3.8", "services": {service_name: service.to_compose()}}
+    )
+
+
+def iter_services(
+    containers_info: Iterable[Dict[str, Any]], include_path_env: bool
+) -> Iterator[OrderedDict]:
+    for inspect_data in containers_info:
+        with stats.phase("transform"):
+            service = transform_to_compose(
+                inspect_data["Name"].strip("/"), inspect_data, include_path_env
+            )
+        yield service
+
+
+def iter_cached_services(
+    cache_path: str,
+    include_path_env: bool,
+    inspector: Inspector,
+    all: bool = False,
+    filters: Optional[Dict[str, List[str]]] = None,
+    ttl: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    # Only containers whose listing entry changed since the last run, that
+    # were updated in place (`docker update`) since then, or whose entry is
+    # older than `ttl` are inspected and transformed; the rest come from the
+    # snapshot cache.
+    from docker_inspect2compose.cache import DEFAULT_TTL, SnapshotCache, fingerprint
+    from docker_inspect2compose.watch import event_container_id
+
+    with SnapshotCache(cache_path, DEFAULT_TTL if ttl is None else ttl) as cache:
+        # The cache's clock starts before the listing, so an update made
+        # while this run is in progress is picked up by the next one.
+        listing = inspector.list_containers(all, filters)
+        if cache.last_sync is not None:
+            # The daemon only remembers recent events; the TTL covers any
+            # update it has already forgotten.
+            cache.invalidate(
+                event_container_id(event)
+                for event in inspector.iter_events(
+                    cache.last_sync,
+                    {"type": ["container"], "event": ["update"]},
+                    until=cache.now,
+                )
+            )
+        keys = [fingerprint(entry, include_path_env) for entry in listing]
+        cached = [
+            cache.get(entry["Id"], key) for entry, key in zip(listing, keys)
         ]
+        changed_ids = [
+            entry["Id"] for entry, service in zip(listing, cached) if service is None
+        ]
+        inspected = inspector.iter_inspect(changed_ids)
+        for entry, key, service in zip(listing, keys, cached):
+            if service is None:
+                service = next(iter_services([next(inspected)], include_path_env))
+                cache.put(entry["Id"], key, service)
+            yield service
+        cache.prune(entry["Id"] for entry in listing)
+        cache.last_sync = cache.now
+        stats.add("cache_hits", cache.hits)
+        stats.add("cache_misses", cache.misses)
+
+
+def is_regular_file(path: str) -> bool:
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def file_digest(path: str) -> Optional[bytes]:
+    # None for a missing file, or for a device or FIFO, whose content can't
+    # be compared (and reading a FIFO would block).
+    if not is_regular_file(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256()
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+            return digest.digest()
+    except FileNotFoundError:
+        return None
+
+
+class HashingWriter:
+    """Text stream that hashes everything written, optionally passing it on."""
+
+    encoding = "utf-8"
+
+    def __init__(self, stream: Optional[IO[str]] = None) -> None:
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> int:
+        data = text.encode(self.encoding)
+        self.hash.update(data)
+        self.size += len(data)
+        return self.stream.write(text) if self.stream is not None else len(text)
+
+    def flush(self) -> None:
+        if self.stream is not None:
+            self.stream.flush()
+
+    def digest(self) -> bytes:
+        return self.hash.digest()
+
+
+class AtomicWriter(HashingWriter):
+    """Write to a temporary file in the same directory and rename it over
+    `path`, so readers never see a partially written file.
+
+    If `path` is a symlink, the file it points to is replaced and the link
+    kept. The mode, owner and group of an existing file are preserved where
+    permissions allow. With `skip_if_unchanged`, the temporary file is
+    discarded instead when its content hash matches the existing file,
+    leaving its mtime alone.
+
+    Anything other than a regular file (e.g. /dev/null, /dev/stdout or a
+    FIFO) can't be replaced and is written to directly.
+    """
+
+    def __init__(self, path: str, skip_if_unchanged: bool = False) -> None:
+        super().__init__()
+        self.path = path
+        self.skip_if_unchanged = skip_if_unchanged
+        self.written = False
+
+    def __enter__(self) -> "AtomicWriter":
+        import tempfile
+
+        try:
+            special = not stat.S_ISREG(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            special = False
+        if special:
+            self.tmp_path = None
+            self.stream = open(self.path, "w")
+            return self
+        self.target = os.path.realpath(self.path)
+        fd, self.tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.target),
+            prefix=f".{os.path.basename(self.target)}.",
+            suffix=".tmp",
+        )
+        self.stream = os.fdopen(fd, "w")
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        self.stream.close()
+        if self.tmp_path is None:
+            self.written = exc_type is None
+            return
+        if exc_type is not None or (
+            self.skip_if_unchanged and file_digest(self.target) == self.digest()
+        ):
+            os.unlink(self.tmp_path)
+            return
+        try:
+            existing = os.stat(self.target)
+        except FileNotFoundError:
+            os.chmod(self.tmp_path, 0o666 & ~current_umask())
+        else:
+            copy_ownership(existing, self.tmp_path)
+            os.chmod(self.tmp_path, existing.st_mode & 0o7777)
+        os.replace(self.tmp_path, self.target)
+        self.written = True
+
+
+def copy_ownership(existing: os.stat_result, path: str) -> None:
+    # Only root can give a file away, but a user can still keep the group
+    # of a file they share through a group they belong to.
+    if not hasattr(os, "chown"):
+        return
+    current = os.stat(path)
+    if (current.st_uid, current.st_gid) == (existing.st_uid, existing.st_gid):
+        return
+    try:
+        os.chown(path, existing.st_uid, existing.st_gid)
+    except PermissionError:
+        try:
+            os.chown(path, -1, existing.st_gid)
+        except PermissionError:
+            pass
+
+
+def current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def dump_services(
+    services: Iterable[Dict[str, Any]], stream: IO[str], yaml_backend: str = "auto"
+) -> int:
+    from docker_inspect2compose.compose_writer import StreamingComposeWriter
+
+    with StreamingComposeWriter(stream, backend=yaml_backend) as writer:
+        for service in services:
+            writer.add(service)
+    return len(writer.service_names)
+
+
+def write_streaming_compose(
+    services: Iterable[Dict[str, Any]], output: str, yaml_backend: str = "auto"
+) -> int:
+    # Files are written atomically and left untouched if their content
+    # would not change.
+    if output == "-":
+        if stats.active() is None:
+            return dump_services(services, sys.stdout, yaml_backend)
+        stream = HashingWriter(sys.stdout)
+        count = dump_services(services, stream, yaml_backend)
+        stats.add("bytes_written", stream.size)
+        stats.add("writes_performed")
+        return count
+    with AtomicWriter(output, skip_if_unchanged=True) as f:
+        count = dump_services(services, f, yaml_backend)
+    if f.written:
+        stats.add("bytes_written", f.size)
+        stats.add("writes_performed")
+    else:
+        stats.add("writes_skipped")
+        logging.info(f"{output} is unchanged.")
+    return count
+
+
+def services_differ(
+    services: Iterable[Dict[str, Any]], output: str, yaml_backend: str = "auto"
+) -> bool:
+    # Whether writing `services` would change `output`, without writing it.
+    stream = HashingWriter()
+    dump_services(services, stream, yaml_backend)
+    return stream.digest() != file_digest(output)
+
+
+def write_if_changed(text: str, output: str) -> bool:
+    # Skips the write (and the mtime change) when the file already holds
+    # exactly this content. Returns whether anything was written.
+    if output == "-":
+        sys.stdout.write(text)
+        stats.add("bytes_written", len(text.encode("utf-8")))
+        stats.add("writes_performed")
+        return True
+    with AtomicWriter(output, skip_if_unchanged=True) as f:
+        f.write(text)
+    if f.written:
+        stats.add("bytes_written", f.size)
+        stats.add("writes_performed")
+    else:
+        stats.add("writes_skipped")
+    return f.written
+
+
+def write_compose(
+    compose_data: Dict[str, Any], output: str, yaml_backend: str = "auto"
+) -> None:
+    from docker_inspect2compose.compose_writer import dump_compose
 
-    def get_environment() -> List[str]:
-        env = inspect_data["Config"]["Env"]
-        if not include_path_env:
-            env = [e for e in env if not e.startswith("PATH=")]
-        return env
-
-    def get_restart_policy() -> Dict[str, Any]:
-        restart_policy = inspect_data["HostConfig"]["RestartPolicy"]
-        if restart_policy["Name"]:
-            policy = {"condition": restart_policy["Name"]}
-            if restart_policy["Name"] == "on-failure":
-                policy["max_attempts"] = restart_policy.get("MaximumRetryCount", 0)
-            return policy
-        return {}
-
-    def get_resources() -> Dict[str, Any]:
-        resources = {}
-        if inspect_data["HostConfig"]["NanoCpus"]:
-            resources["cpus"] = str(inspect_data["HostConfig"]["NanoCpus"] / 1e9)
-        if inspect_data["HostConfig"]["Memory"]:
-            resources["memory"] = inspect_data["HostConfig"]["Memory"]
-        return resources
-
-    def get_logging() -> Dict[str, Any]:
-        log_config = inspect_data["HostConfig"]["LogConfig"]
-        if log_config["Type"]:
-            return {"driver": log_config["Type"], "options": log_config["Config"]}
-        return {}
-
-    def get_networks() -> List[str]:
-        return list(inspect_data["NetworkSettings"]["Networks"].keys())
-
-    environment = get_environment()
-    restart_policy = get_restart_policy()
-    resources = get_resources()
-    logging_config = get_logging()
-    networks = get_networks()
-
-    service_dict = OrderedDict(
-        {
-            "image": inspect_data["Config"]["Image"],
-            "container_name": service_name,
-            "ports": get_ports(),
-            "volumes": get_volumes(),
-        }
-    )
-
-    if environment:
-        service_dict["environment"] = environment
-    if restart_policy:
-        service_dict["deploy"] = {"restart_policy": restart_policy}
-    if resources:
-        if "deploy" not in service_dict:
-            service_dict["deploy"] = {}
-        service_dict["deploy"]["resources"] = resources
-    if logging_config:
-        service_dict["logging"] = logging_config
-    if networks:
-        service_dict["networks"] = networks
-
-    config = OrderedDict({"version": "3.8", "services": {service_name: service_dict}})
-
-    return config
-
-
-def write_compose(compose_data: Dict[str, Any], output: str) -> None:
-    # Convert OrderedDict to regular dict for YAML dumping
-    compose_data = json.loads(json.dumps(compose_data))
     with open(output, "w") if output != "-" else sys.stdout as f:
-        yaml.dump(compose_data, f, default_flow_style=False, sort_keys=False)
+        dump_compose(compose_data, f, backend=yaml_backend)
+
 
+def load_existing_compose(file_path: str, yaml_backend: str = "auto") -> Dict[str, Any]:
+    from docker_inspect2compose.compose_writer import load_compose
 
-def load_existing_compose(file_path: str) -> Dict[str, Any]:
     with open(file_path, "r") as f:
-        return yaml.safe_load(f)
+        return load_compose(f, backend=yaml_backend)
+
+
+def merge_lists(existing: List[Any], new: List[Any]) -> List[Any]:
+    # Ordered union: existing items first, then new items not already present.
+    merged = list(existing)
+    seen = set()
+    unhashable = []
+    for item in merged:
+        try:
+            seen.add(item)
+        except TypeError:
+            unhashable.append(item)
+    for item in new:
+        try:
+            if item in seen:
+                continue
+            seen.add(item)
+        except TypeError:
+            if item in unhashable:
+                continue
+            unhashable.append(item)
+        merged.append(item)
+    return merged
+
+
+def merge_environment(existing: List[str], new: List[str]) -> List[str]:
+    # Variables are matched by name, so a changed value replaces the old one.
+    merged = OrderedDict((e.split("=", 1)[0], e) for e in existing)
+    merged.update((e.split("=", 1)[0], e) for e in new)
+    return list(merged.values())
+
+
+def environment_list(environment: Any) -> Any:
+    # The mapping form of `environment:` ({A: 1, B: null}) as KEY=VALUE
+    # items; a variable without a value is passed through from the host.
+    if not isinstance(environment, dict):
+        return environment
+    return [
+        str(name)
+        if value is None
+        else f"{name}={str(value).lower() if isinstance(value, bool) else value}"
+        for name, value in environment.items()
+    ]
+
+
+def deep_merge(existing: Any, new: Any, key: Optional[str] = None) -> Any:
+    if key == "environment":
+        existing, new = environment_list(existing), environment_list(new)
+    if isinstance(existing, dict) and isinstance(new, dict):
+        merged = existing.copy()
+        for k, value in new.items():
+            merged[k] = deep_merge(existing[k], value, k) if k in existing else value
+        return merged
+    if isinstance(existing, list) and isinstance(new, list):
+        if key == "environment":
+            return merge_environment(existing, new)
+        return merge_lists(existing, new)
+    return new
 
 
 def merge_compose(
-    existing_compose: Dict[str, Any], new_services: List[Dict[str, Any]]
+    existing_compose: Dict[str, Any],
+    new_services: Iterable[Dict[str, Any]],
+    strategy: str = "add",
 ) -> Dict[str, Any]:
-    if "services" not in existing_compose:
+    # "add" only adds services missing from the existing file, "replace"
+    # overwrites existing services and "deep" merges them key by key.
+    if strategy not in MERGE_STRATEGIES:
+        raise ValueError(f"Unknown merge strategy: {strategy}")
+    if not existing_compose.get("services"):
         existing_compose["services"] = {}
+    services = existing_compose["services"]
     for new_service in new_services:
-        service_name = list(new_service["services"].keys())[0]
-        if service_name not in existing_compose["services"]:
-            existing_compose["services"].update(new_service["services"])
+        for service_name, service in new_service["services"].items():
+            if service_name not in services or strategy == "replace":
+                services[service_name] = service
+            elif strategy == "deep":
+                services[service_name] = deep_merge(services[service_name], service)
     return existing_compose
 
 
+def counted_services(services: Iterable[Any]) -> Iterator[Any]:
+    for service in services:
+        stats.add("containers")
+        yield service
+
+
+def report_stats(
+    run_stats: "stats.RunStats",
+    table: bool,
+    json_path: Optional[str],
+    metrics_path: Optional[str] = None,
+) -> None:
+    run_stats.finish()
+    if table:
+        print(run_stats.format_table(), file=sys.stderr)
+    if json_path:
+        with open(json_path, "w") as f:
+            f.write(run_stats.to_json() + "\n")
+    if metrics_path:
+        from docker_inspect2compose.metrics import format_metrics
+
+        # node_exporter may read the file at any time, so replace it atomically.
+        with AtomicWriter(metrics_path) as f:
+            f.write(format_metrics(run_stats))
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Transform Docker container info to Docker Compose service definition."
     )
     parser.add_argument(
         "container",
-        nargs="?",
-        default=None,
-        help="ID or name of the running Docker container (optional)",
+        nargs="*",
+        help="IDs, names or name globs (e.g. 'web-*') of Docker containers "
+        "(optional, default: all running containers)",
     )
     parser.add_argument(
         "--output",
@@ -188,52 +1040,306 @@ def main() -> None:
         "--add-to",
         help="Path to an existing docker-compose.yml file to add the new service to.",
     )
+    parser.add_argument(
+        "--filter",
+        action="append",
+        metavar="KEY=VALUE",
+        help="Only include containers matching a `docker ps` filter, e.g. "
+        "label=com.example.stack=web, name=db or network=backend. May be repeated.",
+    )
+    parser.add_argument(
+        "--all",
+        "-a",
+        action="store_true",
+        help="Include stopped containers, not just running ones.",
+    )
+    parser.add_argument(
+        "--merge-strategy",
+        choices=MERGE_STRATEGIES,
+        default="add",
+        help="How --add-to handles services that already exist: keep them (add), "
+        "overwrite them (replace), or merge them key by key (deep). Default: add.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Number of containers to inspect concurrently (default: {DEFAULT_JOBS}).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="How to talk to the Docker daemon: the Docker SDK, the docker CLI, "
+        "or a built-in asyncio client on the Docker unix socket (default: auto).",
+    )
+    parser.add_argument(
+        "--from-json",
+        action="append",
+        metavar="PATH",
+        help="Read saved `docker inspect` output (a JSON array, or JSON Lines) from "
+        "PATH instead of querying Docker. Use '-' for stdin. May be repeated.",
+    )
+    parser.add_argument(
+        "--yaml-backend",
+        choices=("auto", "c", "python"),
+        default="auto",
+        help="YAML implementation: libyaml (c) or pure Python (default: auto, "
+        "which uses libyaml when available).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rewrite the output file whenever a container is "
+        "created, started, stopped, removed, renamed or updated.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Don't write anything; exit with status 1 if the output file differs "
+        "from what would be generated.",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="SQLite snapshot cache of transformed services. Only containers that "
+        "are new or changed since the previous run are inspected.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        metavar="SECONDS",
+        help="Re-inspect containers whose cache entry is older than SECONDS "
+        "(default: 3600).",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print wall and CPU time per phase (inspect, read, transform, load, "
+        "merge, write) and byte counts to stderr when done.",
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="PATH",
+        help="Write the --stats report as JSON to PATH.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Run under cProfile and write the profile to PATH, with a text "
+        "summary of the slowest functions next to it.",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile, also record the top memory allocation sites "
+        "using tracemalloc (slower).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Write Prometheus metrics about the run to PATH (a .prom file in "
+        "node_exporter's textfile collector directory).",
+    )
     args = parser.parse_args()
+    if args.profile_memory and not args.profile:
+        parser.error("--profile-memory requires --profile")
+
+    if args.profile:
+        from docker_inspect2compose.profiling import profile_call
+
+        profile_call(
+            lambda: run(parser, args), args.profile, memory=args.profile_memory
+        )
+    else:
+        run(parser, args)
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    import subprocess
+    import yaml
 
     try:
-        containers_info = get_container_info(args.container)
-        new_services = [
-            transform_to_compose(
-                inspect_data["Name"].strip("/"), inspect_data, args.include_path_env
+        filters = parse_filters(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.cache_ttl is not None and not args.cache:
+        parser.error("--cache-ttl requires --cache")
+    if args.cache and (args.container or args.from_json or args.watch):
+        parser.error(
+            "--cache cannot be combined with a container, --from-json or --watch"
+        )
+    if args.watch and (filters or args.all):
+        parser.error("--filter and --all cannot be used with --watch")
+    if args.from_json and (filters or args.all):
+        parser.error("--filter and --all cannot be used with --from-json")
+    if args.check and (args.output == "-" or args.watch):
+        parser.error("--check requires --output FILE and cannot be used with --watch")
+    if args.watch and (
+        args.output == "-" or args.from_json or args.add_to or args.container
+    ):
+        parser.error(
+            "--watch requires --output FILE and cannot be combined with a "
+            "container, --from-json or --add-to"
+        )
+
+    from docker_inspect2compose.models import INSPECT_FIELDS
+
+    run_stats = (
+        stats.enable() if args.stats or args.stats_json or args.metrics_file else None
+    )
+    inspector = None
+    try:
+        # Failures from here on are recorded in the run's stats and metrics.
+        if args.yaml_backend == "c" and not getattr(yaml, "__with_libyaml__", False):
+            raise BackendUnavailableError(
+                "The libyaml C backend is not available in this PyYAML."
             )
-            for inspect_data in containers_info
-        ]
+        inspector = Inspector(args.backend, args.jobs, INSPECT_FIELDS)
+        if args.watch:
+            from docker_inspect2compose.watch import ComposeWatcher
+
+            ComposeWatcher(
+                args.output,
+                args.include_path_env,
+                inspector,
+                yaml_backend=args.yaml_backend,
+            ).run()
+            return
+
+        if args.from_json:
+            containers_info = select_containers(
+                stats.iterate(
+                    "read",
+                    (
+                        inspect_data
+                        for source in args.from_json
+                        for inspect_data in iter_inspect_file(source)
+                    ),
+                ),
+                args.container,
+            )
+            services = iter_services(containers_info, args.include_path_env)
+        elif args.cache:
+            services = iter_cached_services(
+                args.cache,
+                args.include_path_env,
+                inspector,
+                all=args.all,
+                filters=filters,
+                ttl=args.cache_ttl,
+            )
+        else:
+            containers_info = inspector.iter_container_info(
+                args.container, all=args.all, filters=filters
+            )
+            services = iter_services(containers_info, args.include_path_env)
+        # Services are streamed, so fetch the first one before any output
+        # is written; lookup errors then leave the output file untouched.
+        first = next(services, None)
+        if first is None and args.container:
+            raise ContainerNotFoundError(", ".join(args.container))
+        if first is not None:
+            services = itertools.chain([first], services)
+        services = counted_services(services)
 
         if args.add_to:
-            existing_compose = load_existing_compose(args.add_to)
-            updated_compose = merge_compose(existing_compose, new_services)
-            write_compose(updated_compose, args.output)
+            from docker_inspect2compose.compose_writer import ComposeFile
+
+            with stats.phase("load"):
+                compose_file = ComposeFile.load(args.add_to, args.yaml_backend)
+            stats.add("bytes_parsed", len(compose_file.text))
+            with stats.phase("merge"):
+                merge_compose(compose_file.data, services, args.merge_strategy)
+            with stats.phase("write"):
+                text = compose_file.render()
+                if args.check:
+                    drift = file_digest(args.output) != hashlib.sha256(
+                        text.encode("utf-8")
+                    ).digest()
+                elif not write_if_changed(text, args.output):
+                    logging.info(f"{args.output} is unchanged.")
+        elif args.check:
+            with stats.phase("write"):
+                drift = services_differ(services, args.output, args.yaml_backend)
         else:
-            combined_services = OrderedDict({"version": "3.8", "services": {}})
-            for service in new_services:
-                combined_services["services"].update(service["services"])
-            write_compose(combined_services, args.output)
+            with stats.phase("write"):
+                write_streaming_compose(services, args.output, args.yaml_backend)
+
+        if args.check:
+            if drift:
+                raise OutputOutOfDateError(f"{args.output} is out of date.")
+            logging.info(f"{args.output} is up to date.")
+            return
 
         logging.info("Docker Compose service definition(s) created successfully.")
-    except NotFound:
-        logging.error(f"Container {args.container} not found.")
+    except (BackendUnavailableError, OutputOutOfDateError) as e:
+        stats.error(e)
+        logging.error(str(e))
         sys.exit(1)
-    except APIError as e:
+    except AmbiguousContainerError as e:
+        stats.error(e)
+        logging.error(f"Container ID prefix {e} matches more than one container.")
+        sys.exit(1)
+    except ContainerNotFoundError as e:
+        stats.error(e)
+        logging.error(f"Container {e} not found.")
+        sys.exit(1)
+    except (
+        lazy_error("docker.errors", "NotFound"),
+        lazy_error("docker_inspect2compose.aioclient", "ContainerNotFound"),
+    ) as e:
+        stats.error(e)
+        logging.error(f"Container {', '.join(args.container)} not found.")
+        sys.exit(1)
+    except lazy_error("docker_inspect2compose.aioclient", "EngineAPIError") as e:
+        stats.error(e)
         logging.error(f"Docker API error: {e}")
         sys.exit(1)
-    except DockerException as e:
+    except lazy_error("docker.errors", "APIError") as e:
+        stats.error(e)
+        logging.error(f"Docker API error: {e}")
+        sys.exit(1)
+    except lazy_error("docker.errors", "DockerException") as e:
+        stats.error(e)
         logging.error(f"Docker exception occurred: {e}")
         sys.exit(1)
     except subprocess.CalledProcessError as e:
+        stats.error(e)
         logging.error(f"Error executing command: {e}")
         sys.exit(1)
-    except json.JSONDecodeError:
+    except ConnectionError as e:
+        stats.error(e)
+        logging.error(f"Lost connection to the Docker daemon: {e}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        stats.error(e)
         logging.error("Error decoding JSON from docker inspect.")
         sys.exit(1)
     except KeyError as e:
+        stats.error(e)
         logging.error(f"Expected key not found in docker inspect data: {e}")
         sys.exit(1)
-    except FileNotFoundError:
-        logging.error(f"File {args.add_to} not found.")
+    except FileNotFoundError as e:
+        stats.error(e)
+        logging.error(f"File {e.filename} not found.")
         sys.exit(1)
     except yaml.YAMLError as e:
+        stats.error(e)
         logging.error(f"Error parsing YAML file: {e}")
         sys.exit(1)
+    except KeyboardInterrupt as e:
+        stats.error(e)
+        sys.exit(130)
+    except Exception as e:
+        stats.error(e)
+        raise
+    finally:
+        if inspector is not None:
+            inspector.close()
+        if run_stats is not None:
+            report_stats(run_stats, args.stats, args.stats_json, args.metrics_file)
 
 
 if __name__ == "__main__":
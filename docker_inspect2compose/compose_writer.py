@@ -0,0 +1,313 @@
+import io
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import yaml
+from yaml.events import (
+    DocumentEndEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+
+MAP_TAG = "tag:yaml.org,2002:map"
+
+# "auto" uses the libyaml C implementation when PyYAML was built with it.
+YAML_BACKENDS = ("auto", "c", "python")
+LIBYAML_AVAILABLE = getattr(yaml, "__with_libyaml__", False)
+
+
+class ComposeDumper(yaml.SafeDumper):
+    """Dumper that writes OrderedDicts as plain mappings in insertion order."""
+
+    def ignore_aliases(self, data: Any) -> bool:
+        # Compose files never use anchors, even if objects are shared.
+        return True
+
+
+ComposeDumper.add_representer(OrderedDict, ComposeDumper.represent_dict)
+
+if LIBYAML_AVAILABLE:
+
+    class CComposeDumper(yaml.CSafeDumper):
+        """ComposeDumper using the libyaml C emitter."""
+
+        def ignore_aliases(self, data: Any) -> bool:
+            return True
+
+    CComposeDumper.add_representer(OrderedDict, CComposeDumper.represent_dict)
+
+
+def use_libyaml(backend: str = "auto") -> bool:
+    if backend not in YAML_BACKENDS:
+        raise ValueError(f"Unknown YAML backend: {backend}")
+    if backend == "c" and not LIBYAML_AVAILABLE:
+        raise ValueError("The libyaml C backend is not available in this PyYAML.")
+    return backend != "python" and LIBYAML_AVAILABLE
+
+
+def get_dumper(backend: str = "auto") -> type:
+    return CComposeDumper if use_libyaml(backend) else ComposeDumper
+
+
+def get_loader(backend: str = "auto") -> type:
+    return yaml.CSafeLoader if use_libyaml(backend) else yaml.SafeLoader
+
+
+def dump_compose(
+    compose_data: Dict[str, Any], stream: IO[str], backend: str = "auto"
+) -> None:
+    yaml.dump(
+        compose_data,
+        stream,
+        Dumper=get_dumper(backend),
+        default_flow_style=False,
+        sort_keys=False,
+    )
+
+
+def load_compose(stream: IO[str], backend: str = "auto") -> Any:
+    return yaml.load(stream, Loader=get_loader(backend))
+
+
+class ComposeFile:
+    """A compose file loaded along with where each service sits in the text.
+
+    `render()` rewrites only the services whose content changed, so
+    comments, formatting and the order of everything else are preserved.
+    """
+
+    def __init__(self, text: str, backend: str = "auto") -> None:
+        self.text = text
+        self.backend = backend
+        loader = get_loader(backend)(text)
+        try:
+            self.node = loader.get_single_node()
+            data = loader.construct_document(self.node) if self.node else None
+        finally:
+            loader.dispose()
+        self.data = data if isinstance(data, dict) else {}
+        # Merging replaces service values rather than mutating them, so a
+        # shallow copy is enough to compare against later.
+        self.original_services = dict(self.data.get("services") or {})
+
+    @classmethod
+    def load(cls, path: str, backend: str = "auto") -> "ComposeFile":
+        with open(path, "r") as f:
+            return cls(f.read(), backend)
+
+    def render(self) -> str:
+        spans = self._service_spans()
+        if spans is None:
+            stream = io.StringIO()
+            dump_compose(self.data, stream, self.backend)
+            return stream.getvalue()
+
+        services = self.data.get("services") or {}
+        lines = self.text.splitlines(keepends=True)
+        column, region_end, spans = spans
+        added = [name for name in services if name not in self.original_services]
+        out = lines[: spans[0][1]]
+        for index, (name, start, end, next_start) in enumerate(spans):
+            if name not in services:
+                pass
+            elif services[name] == self.original_services[name]:
+                out.extend(lines[start:end])
+            else:
+                out.append(self._fragment(name, services[name], column))
+            if index == len(spans) - 1:
+                for new_name in added:
+                    if out and not out[-1].endswith("\n"):
+                        out.append("\n")
+                    out.append(self._fragment(new_name, services[new_name], column))
+            out.extend(lines[end:next_start])
+        out.extend(lines[region_end:])
+        return "".join(out)
+
+    def _fragment(self, name: str, service: Dict[str, Any], column: int) -> str:
+        stream = io.StringIO()
+        dump_compose({name: service}, stream, self.backend)
+        indent = " " * column
+        return "".join(
+            indent + line if line.strip() else line
+            for line in stream.getvalue().splitlines(keepends=True)
+        )
+
+    def _service_spans(
+        self,
+    ) -> Optional[Tuple[int, int, List[Tuple[str, int, int, int]]]]:
+        # Line ranges of each service in a block-style `services:` mapping, as
+        # (name, start, end, next_start); trailing blank and comment lines are
+        # left outside the range. Returns None for layouts that can only be
+        # handled by a full rewrite.
+        if not isinstance(self.node, MappingNode) or self.node.flow_style:
+            return None
+        root_keys = [key for key, _ in self.node.value]
+        services_node = next(
+            (value for key, value in self.node.value if key.value == "services"), None
+        )
+        if (
+            not isinstance(services_node, MappingNode)
+            or services_node.flow_style
+            or not services_node.value
+        ):
+            return None
+        if _has_shared_nodes(self.node, services_node):
+            # An anchor under `services` (or an alias to one) would be lost
+            # or left dangling by re-dumping a single service.
+            return None
+        keys = [key for key, _ in services_node.value]
+        column = keys[0].start_mark.column
+        if any(
+            not isinstance(key, ScalarNode)
+            or key.start_mark.column != column
+            or key.value not in self.original_services
+            for key in keys
+        ):
+            return None
+
+        lines = self.text.splitlines(keepends=True)
+        services_index = [key.value for key in root_keys].index("services")
+        if services_index + 1 < len(root_keys):
+            region_end = root_keys[services_index + 1].start_mark.line
+        else:
+            # The document ends here, before any `...` end marker (and the
+            # comments after it), which must stay after added services.
+            end_mark = self.node.end_mark
+            region_end = min(end_mark.line + (end_mark.column > 0), len(lines))
+        starts = [key.start_mark.line for key in keys]
+        spans = []
+        for index, key in enumerate(keys):
+            start = starts[index]
+            next_start = starts[index + 1] if index + 1 < len(keys) else region_end
+            end = next_start
+            while end > start + 1 and (
+                not lines[end - 1].strip() or lines[end - 1].lstrip().startswith("#")
+            ):
+                end -= 1
+            spans.append((key.value, start, end, next_start))
+        return column, region_end, spans
+
+
+def _count_nodes(node: Any, counts: Dict[int, int]) -> Dict[int, int]:
+    # How many times each node is referenced; an aliased node is composed
+    # once and referenced again wherever its alias appears.
+    counts[id(node)] = counts.get(id(node), 0) + 1
+    if counts[id(node)] == 1:
+        if isinstance(node, SequenceNode):
+            for item in node.value:
+                _count_nodes(item, counts)
+        elif isinstance(node, MappingNode):
+            for key, value in node.value:
+                _count_nodes(key, counts)
+                _count_nodes(value, counts)
+    return counts
+
+
+def _has_shared_nodes(root: Any, subtree: Any) -> bool:
+    # Whether any node under `subtree` is referenced more than once in the
+    # document, i.e. carries an anchor that is aliased somewhere.
+    counts = _count_nodes(root, {})
+    return any(counts[node_id] > 1 for node_id in _count_nodes(subtree, {}))
+
+
+class StreamingComposeWriter:
+    """Write a compose document one service at a time.
+
+    The YAML event stream is the same one `yaml.dump` produces for the
+    whole document, so the output is identical to the batch writer, but
+    each service is emitted as soon as it is added.
+    """
+
+    def __init__(
+        self, stream: IO[str], version: str = "3.8", backend: str = "auto"
+    ) -> None:
+        self.dumper = get_dumper(backend)(
+            stream, default_flow_style=False, sort_keys=False
+        )
+        self.version = version
+        self.service_names = set()
+
+    def open(self) -> None:
+        self.dumper.open()
+        self.dumper.emit(DocumentStartEvent(explicit=False))
+        self.dumper.emit(MappingStartEvent(None, MAP_TAG, True, flow_style=False))
+        self._serialize("version")
+        self._serialize(self.version)
+        self._serialize("services")
+        self.dumper.emit(MappingStartEvent(None, MAP_TAG, True, flow_style=False))
+
+    def add(self, compose: Dict[str, Any]) -> None:
+        for service_name, service in compose["services"].items():
+            self.add_service(service_name, service)
+
+    def add_service(self, service_name: str, service: Dict[str, Any]) -> bool:
+        # Services are written as they arrive, so unlike a dict update the
+        # first service with a given name wins.
+        if service_name in self.service_names:
+            logging.warning(
+                f"Skipping duplicate service {service_name!r}; keeping the first one."
+            )
+            return False
+        self.service_names.add(service_name)
+        self._serialize(service_name)
+        self._serialize(service)
+        return True
+
+    def close(self) -> None:
+        self.dumper.emit(MappingEndEvent())
+        self.dumper.emit(MappingEndEvent())
+        self.dumper.emit(DocumentEndEvent(explicit=False))
+        self.dumper.close()
+        self.dumper.dispose()
+
+    def __enter__(self) -> "StreamingComposeWriter":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _serialize(self, data: Any) -> None:
+        # Represent a single value and emit its events without the
+        # surrounding document events. The C emitter has no serialize_node,
+        # so this mirrors Serializer.serialize_node (minus aliases) on top of
+        # emit(), which both backends provide.
+        dumper = self.dumper
+        node = dumper.represent_data(data)
+        dumper.represented_objects = {}
+        dumper.object_keeper = []
+        dumper.alias_key = None
+        self._emit_node(node)
+
+    def _emit_node(self, node: Any) -> None:
+        dumper = self.dumper
+        if isinstance(node, ScalarNode):
+            detected_tag = dumper.resolve(ScalarNode, node.value, (True, False))
+            default_tag = dumper.resolve(ScalarNode, node.value, (False, True))
+            implicit = (node.tag == detected_tag), (node.tag == default_tag)
+            dumper.emit(
+                ScalarEvent(None, node.tag, implicit, node.value, style=node.style)
+            )
+        elif isinstance(node, SequenceNode):
+            implicit = node.tag == dumper.resolve(SequenceNode, node.value, True)
+            dumper.emit(
+                SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+            )
+            for item in node.value:
+                self._emit_node(item)
+            dumper.emit(SequenceEndEvent())
+        elif isinstance(node, MappingNode):
+            implicit = node.tag == dumper.resolve(MappingNode, node.value, True)
+            dumper.emit(
+                MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+            )
+            for key, value in node.value:
+                self._emit_node(key)
+                self._emit_node(value)
+            dumper.emit(MappingEndEvent())
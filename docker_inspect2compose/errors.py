@@ -0,0 +1,7 @@
+# Exceptions shared by the CLI and the client modules. They live here rather
+# than in `cli` so that running `python -m docker_inspect2compose.cli` (which
+# loads that module a second time as __main__) still catches them.
+
+
+class BackendUnavailableError(RuntimeError):
+    pass
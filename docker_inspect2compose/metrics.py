@@ -0,0 +1,137 @@
+import time
+from typing import List, Optional, Sequence
+
+from docker_inspect2compose.stats import RunStats
+
+PREFIX = "docker_inspect2compose"
+
+# Upper bounds (seconds) of the inspect latency histogram buckets; these are
+# the Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric(
+    lines: List[str], name: str, kind: str, help: str, samples: Sequence
+) -> None:
+    # samples: (labels, value) pairs, where labels is a "k=v" string or "".
+    lines.append(f"# HELP {PREFIX}_{name} {help}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+    for labels, value in samples:
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{PREFIX}_{name}{suffix} {value}")
+
+
+def _histogram(
+    lines: List[str], name: str, help: str, observations: List[float]
+) -> None:
+    lines.append(f"# HELP {PREFIX}_{name} {help}")
+    lines.append(f"# TYPE {PREFIX}_{name} histogram")
+    for bound in LATENCY_BUCKETS:
+        count = sum(1 for seconds in observations if seconds <= bound)
+        lines.append(f'{PREFIX}_{name}_bucket{{le="{bound}"}} {count}')
+    lines.append(f'{PREFIX}_{name}_bucket{{le="+Inf"}} {len(observations)}')
+    lines.append(f"{PREFIX}_{name}_sum {sum(observations)}")
+    lines.append(f"{PREFIX}_{name}_count {len(observations)}")
+
+
+def format_metrics(run_stats: RunStats, timestamp: Optional[float] = None) -> str:
+    """Render a run's stats in the Prometheus text exposition format, for
+    node_exporter's textfile collector.
+
+    Every value describes the most recent run, so counts are gauges rather
+    than counters.
+    """
+    counters = run_stats.counters
+    inspect_latencies = run_stats.latencies.get("inspect", [])
+    lines = []  # type: List[str]
+    _metric(
+        lines,
+        "last_run_timestamp_seconds",
+        "gauge",
+        "Unix time the last run finished.",
+        [("", timestamp if timestamp is not None else time.time())],
+    )
+    _metric(
+        lines,
+        "last_run_success",
+        "gauge",
+        "Whether the last run finished without errors.",
+        [("", 0 if run_stats.errors else 1)],
+    )
+    _metric(
+        lines,
+        "run_duration_seconds",
+        "gauge",
+        "Wall time of the last run.",
+        [("", run_stats.total_wall)],
+    )
+    _metric(
+        lines,
+        "phase_duration_seconds",
+        "gauge",
+        "Wall time spent in each phase of the last run.",
+        [(f'phase="{name}"', seconds) for name, seconds in run_stats.wall.items()],
+    )
+    _metric(
+        lines,
+        "containers",
+        "gauge",
+        "Services written by the last run.",
+        [("", counters["containers"])],
+    )
+    _metric(
+        lines,
+        "containers_inspected",
+        "gauge",
+        "Containers inspected by the last run (excluding cache hits).",
+        [("", len(inspect_latencies))],
+    )
+    _histogram(
+        lines,
+        "inspect_latency_seconds",
+        "Round trip of each inspect request in the last run.",
+        inspect_latencies,
+    )
+    hits = counters.get("cache_hits", 0)
+    misses = counters.get("cache_misses", 0)
+    if hits or misses:
+        _metric(
+            lines,
+            "cache_lookups",
+            "gauge",
+            "Snapshot cache lookups in the last run.",
+            [('result="hit"', hits), ('result="miss"', misses)],
+        )
+        _metric(
+            lines,
+            "cache_hit_ratio",
+            "gauge",
+            "Fraction of snapshot cache lookups that hit in the last run.",
+            [("", hits / (hits + misses))],
+        )
+    _metric(
+        lines,
+        "output_writes",
+        "gauge",
+        "Output writes performed, or skipped because the content was unchanged.",
+        [
+            ('result="performed"', counters.get("writes_performed", 0)),
+            ('result="skipped"', counters.get("writes_skipped", 0)),
+        ],
+    )
+    if run_stats.errors:
+        _metric(
+            lines,
+            "errors",
+            "gauge",
+            "Errors in the last run by exception class.",
+            [
+                (f'class="{_escape(name)}"', count)
+                for name, count in run_stats.errors.items()
+            ],
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# NamedTuples are used for the models: they define `__slots__ = ()`, so each
+# instance is a compact tuple holding only the fields parsed from the much
+# larger inspect document.
+
+
+# The subset of a `docker inspect` document needed to build a ContainerSpec,
+# plus the fields used to select containers and track their state. `None`
+# means the whole value at that key is needed.
+INSPECT_FIELDS = {
+    "Id": None,
+    "Name": None,
+    "State": {"Running": None},
+    "Config": {"Image": None, "Env": None},
+    "HostConfig": {
+        "RestartPolicy": None,
+        "NanoCpus": None,
+        "Memory": None,
+        "LogConfig": None,
+    },
+    "NetworkSettings": {"Ports": None, "Networks": None},
+    "Mounts": None,
+}  # type: Dict[str, Any]
+
+
+class PortBinding(NamedTuple):
+    host_port: str
+    container_port: str
+    protocol: str = "tcp"
+
+    def to_compose(self) -> str:
+        return f"{self.host_port}:{self.container_port}"
+
+
+class Mount(NamedTuple):
+    source: str
+    destination: str
+
+    def to_compose(self) -> str:
+        return f"{self.source}:{self.destination}"
+
+
+class ContainerSpec(NamedTuple):
+    """The parts of a `docker inspect` document used to build a service."""
+
+    name: str
+    image: str
+    ports: Tuple[PortBinding, ...]
+    mounts: Tuple[Mount, ...]
+    env: Tuple[str, ...]
+    restart_policy: str
+    restart_max_retries: int
+    nano_cpus: int
+    memory: int
+    log_driver: str
+    log_options: Dict[str, str]
+    networks: Tuple[str, ...]
+
+    @classmethod
+    def from_inspect(cls, inspect_data: Dict[str, Any]) -> "ContainerSpec":
+        host_config = inspect_data["HostConfig"]
+        network_settings = inspect_data["NetworkSettings"]
+        restart_policy = host_config["RestartPolicy"]
+        log_config = host_config["LogConfig"]
+        return cls(
+            name=inspect_data.get("Name", "").strip("/"),
+            image=inspect_data["Config"]["Image"],
+            ports=tuple(
+                PortBinding(host_port["HostPort"], *container_port.split("/", 1))
+                for container_port, host_ports in network_settings["Ports"].items()
+                if host_ports is not None
+                for host_port in host_ports
+            ),
+            mounts=tuple(
+                Mount(mount["Source"], mount["Destination"])
+                for mount in inspect_data["Mounts"]
+            ),
+            env=tuple(inspect_data["Config"]["Env"]),
+            restart_policy=restart_policy["Name"],
+            restart_max_retries=restart_policy.get("MaximumRetryCount", 0),
+            nano_cpus=host_config["NanoCpus"],
+            memory=host_config["Memory"],
+            log_driver=log_config["Type"],
+            log_options=log_config["Config"],
+            networks=tuple(network_settings["Networks"]),
+        )
+
+
+class ServiceSpec(NamedTuple):
+    """A Docker Compose service definition."""
+
+    name: str
+    image: str
+    ports: Tuple[str, ...] = ()
+    volumes: Tuple[str, ...] = ()
+    environment: Tuple[str, ...] = ()
+    restart_policy: Optional[Dict[str, Any]] = None
+    resources: Optional[Dict[str, Any]] = None
+    logging: Optional[Dict[str, Any]] = None
+    networks: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_container(
+        cls,
+        container: ContainerSpec,
+        include_path_env: bool = False,
+        name: Optional[str] = None,
+    ) -> "ServiceSpec":
+        environment = container.env
+        if not include_path_env:
+            environment = tuple(e for e in environment if not e.startswith("PATH="))
+
+        restart_policy = None
+        if container.restart_policy:
+            restart_policy = {"condition": container.restart_policy}
+            if container.restart_policy == "on-failure":
+                restart_policy["max_attempts"] = container.restart_max_retries
+
+        resources = {}  # type: Dict[str, Any]
+        if container.nano_cpus:
+            resources["cpus"] = str(container.nano_cpus / 1e9)
+        if container.memory:
+            resources["memory"] = container.memory
+
+        logging = None
+        if container.log_driver:
+            logging = {"driver": container.log_driver, "options": container.log_options}
+
+        return cls(
+            name=name or container.name,
+            image=container.image,
+            ports=tuple(port.to_compose() for port in container.ports),
+            volumes=tuple(mount.to_compose() for mount in container.mounts),
+            environment=environment,
+            restart_policy=restart_policy,
+            resources=resources or None,
+            logging=logging,
+            networks=container.networks,
+        )
+
+    def to_compose(self) -> OrderedDict:
+        service_dict = OrderedDict(
+            {
+                "image": self.image,
+                "container_name": self.name,
+                "ports": list(self.ports),
+                "volumes": list(self.volumes),
+            }
+        )
+        if self.environment:
+            service_dict["environment"] = list(self.environment)
+        if self.restart_policy:
+            service_dict["deploy"] = {"restart_policy": self.restart_policy}
+        if self.resources:
+            service_dict.setdefault("deploy", {})["resources"] = self.resources
+        if self.logging:
+            service_dict["logging"] = self.logging
+        if self.networks:
+            service_dict["networks"] = list(self.networks)
+        return service_dict
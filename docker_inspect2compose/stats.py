@@ -0,0 +1,162 @@
+import contextlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Phases in the order they are reported.
+PHASES = ("inspect", "read", "transform", "load", "merge", "write")
+
+
+class RunStats:
+    """Per-phase wall and CPU time plus counters for one run.
+
+    Phases nest: time spent in an inner phase (e.g. inspecting containers
+    pulled lazily while writing output) is not counted in the outer one,
+    so the phase times add up to the instrumented total.
+    """
+
+    def __init__(self) -> None:
+        self.wall = OrderedDict((name, 0.0) for name in PHASES)  # type: Dict[str, float]
+        self.cpu = OrderedDict((name, 0.0) for name in PHASES)  # type: Dict[str, float]
+        self.counters = OrderedDict(
+            [("containers", 0), ("bytes_parsed", 0), ("bytes_written", 0)]
+        )  # type: Dict[str, int]
+        # Wall time of each individual request made in a phase, e.g. the
+        # round trip of each inspect request.
+        self.latencies = OrderedDict()  # type: Dict[str, List[float]]
+        # Errors by exception class name.
+        self.errors = OrderedDict()  # type: Dict[str, int]
+        self._stack = []  # type: List[List[Any]]
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+
+    def _charge_top(self, wall: float, cpu: float) -> None:
+        name, start_wall, start_cpu = self._stack[-1]
+        self.wall[name] = self.wall.get(name, 0.0) + wall - start_wall
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpu - start_cpu
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._stack:
+            self._charge_top(wall, cpu)
+        self._stack.append([name, wall, cpu])
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter(), time.process_time()
+            self._charge_top(wall, cpu)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1:] = [wall, cpu]
+
+    @contextlib.contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        # A phase that also records its duration as one latency sample.
+        start = time.perf_counter()
+        with self.phase(name):
+            yield
+        self.observe(name, time.perf_counter() - start)
+
+    def iterate(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        # Charges the time taken to produce each item to `name`. The wait
+        # for an item isn't a latency sample: with concurrent or batched
+        # requests it says little about how long any one of them took.
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def error(self, exc: BaseException) -> None:
+        name = type(exc).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def finish(self) -> None:
+        self.total_wall = time.perf_counter() - self._start_wall
+        self.total_cpu = time.process_time() - self._start_cpu
+
+    def as_dict(self) -> Dict[str, Any]:
+        return OrderedDict(
+            [
+                (
+                    "phases",
+                    OrderedDict(
+                        (name, {"wall_seconds": self.wall[name], "cpu_seconds": self.cpu[name]})
+                        for name in self.wall
+                    ),
+                ),
+                ("total", {"wall_seconds": self.total_wall, "cpu_seconds": self.total_cpu}),
+                ("counters", self.counters),
+                ("errors", self.errors),
+            ]
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def format_table(self) -> str:
+        lines = [f"{'phase':<10} {'wall ms':>10} {'cpu ms':>10}"]
+        for name in self.wall:
+            lines.append(
+                f"{name:<10} {self.wall[name] * 1000:>10.1f} {self.cpu[name] * 1000:>10.1f}"
+            )
+        lines.append(
+            f"{'total':<10} {self.total_wall * 1000:>10.1f} {self.total_cpu * 1000:>10.1f}"
+        )
+        lines.extend(f"{name}: {value}" for name, value in self.counters.items())
+        return "\n".join(lines)
+
+
+# The stats being collected for the current run, if any. Instrumented code
+# calls the helpers below, which do nothing unless collection was enabled.
+_active = None  # type: Optional[RunStats]
+
+
+def enable() -> RunStats:
+    global _active
+    _active = RunStats()
+    return _active
+
+
+def active() -> Optional[RunStats]:
+    return _active
+
+
+def phase(name: str) -> Any:
+    return _active.phase(name) if _active is not None else contextlib.suppress()
+
+
+def timed(name: str) -> Any:
+    return _active.timed(name) if _active is not None else contextlib.suppress()
+
+
+def iterate(name: str, iterable: Iterable[Any]) -> Iterable[Any]:
+    return _active.iterate(name, iterable) if _active is not None else iterable
+
+
+def observe(name: str, seconds: float) -> None:
+    if _active is not None:
+        _active.observe(name, seconds)
+
+
+def add(counter: str, amount: int = 1) -> None:
+    if _active is not None:
+        _active.add(counter, amount)
+
+
+def error(exc: BaseException) -> None:
+    if _active is not None:
+        _active.error(exc)
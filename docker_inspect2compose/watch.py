@@ -0,0 +1,117 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from docker_inspect2compose.cli import (
+    AtomicWriter,
+    Inspector,
+    dump_services,
+    iter_services,
+    lazy_error,
+)
+
+# Container event actions that can change the generated service definitions.
+WATCHED_ACTIONS = ("create", "start", "die", "destroy", "rename", "update")
+
+
+class EventStreamEndedError(ConnectionError):
+    pass
+
+
+def iter_events(
+    inspector: Inspector, since: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    filters = {"type": ["container"], "event": list(WATCHED_ACTIONS)}
+    return inspector.iter_events(since, filters)
+
+
+def event_container_id(event: Dict[str, Any]) -> str:
+    return event.get("Actor", {}).get("ID") or event["id"]
+
+
+def event_action(event: Dict[str, Any]) -> str:
+    # Some actions carry details, e.g. "health_status: healthy".
+    return (event.get("Action") or event.get("status", "")).split(":")[0]
+
+
+class ComposeWatcher:
+    """Keeps an output compose file in sync with container events.
+
+    Transformed services are held in memory keyed by container ID, so each
+    event only re-inspects the container it refers to.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        include_path_env: bool = False,
+        inspector: Optional[Inspector] = None,
+        yaml_backend: str = "auto",
+        inspect: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    ) -> None:
+        self.output = output
+        self.include_path_env = include_path_env
+        self.inspector = inspector or Inspector()
+        self.yaml_backend = yaml_backend
+        self.inspect = inspect or self.inspect_container
+        self.services = OrderedDict()  # type: OrderedDict
+
+    def inspect_container(self, container_id: str) -> Optional[Dict[str, Any]]:
+        import subprocess
+
+        try:
+            return self.inspector.inspect(container_id)
+        except (
+            lazy_error("docker.errors", "NotFound"),
+            lazy_error("docker_inspect2compose.aioclient", "ContainerNotFound"),
+            subprocess.CalledProcessError,
+        ):
+            return None
+
+    def sync(self) -> None:
+        listing = self.inspector.list_containers()
+        container_ids = [entry["Id"] for entry in listing]
+        inspected = self.inspector.iter_inspect(container_ids)
+        self.services = OrderedDict(
+            zip(container_ids, iter_services(inspected, self.include_path_env))
+        )
+        self.write()
+
+    def handle(self, event: Dict[str, Any]) -> bool:
+        # Returns True if the event changed the generated services.
+        if event.get("Type", "container") != "container":
+            return False
+        action = event_action(event)
+        if action not in WATCHED_ACTIONS:
+            return False
+        container_id = event_container_id(event)
+        inspect_data = None if action == "destroy" else self.inspect(container_id)
+        if inspect_data is None or not inspect_data["State"]["Running"]:
+            changed = self.services.pop(container_id, None) is not None
+        else:
+            service = next(iter_services([inspect_data], self.include_path_env))
+            changed = self.services.get(container_id) != service
+            self.services[container_id] = service
+        if changed:
+            self.write()
+            logging.info(f"Updated {self.output} after {action} of {container_id[:12]}.")
+        return changed
+
+    def write(self) -> None:
+        with AtomicWriter(self.output, skip_if_unchanged=True) as f:
+            dump_services(self.services.values(), f, self.yaml_backend)
+
+    def run(self, events: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        # Subscribe from before the initial listing so no event is missed.
+        # The live stream only ends if the daemon goes away (or `docker
+        # events` exits), which is an error so that supervisors restart us.
+        since = time.time()
+        self.sync()
+        live = events is None
+        if events is None:
+            events = iter_events(self.inspector, since)
+        for event in events:
+            self.handle(event)
+        if live:
+            raise EventStreamEndedError("the event stream ended")
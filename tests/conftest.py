@@ -0,0 +1,21 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The fake Docker daemon and synthetic inspect documents live with the
+# benchmarks, which are plain scripts rather than a package.
+for path in (ROOT, os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest  # noqa: E402
+from fake_docker import FakeDockerDaemon  # noqa: E402
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    # A fake daemon with three running containers, used through DOCKER_HOST.
+    with FakeDockerDaemon(str(tmp_path / "docker.sock"), containers=3) as daemon:
+        monkeypatch.setenv("DOCKER_HOST", daemon.docker_host)
+        yield daemon
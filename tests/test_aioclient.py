@@ -0,0 +1,119 @@
+import asyncio
+import os
+
+import pytest
+from fake_docker import FakeDockerDaemon
+
+from docker_inspect2compose.aioclient import (
+    DEFAULT_SOCKET_PATH,
+    AsyncDockerClient,
+    ContainerNotFound,
+)
+from docker_inspect2compose.cli import BackendUnavailableError
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    with FakeDockerDaemon(str(tmp_path / "docker.sock"), containers=5) as daemon:
+        yield daemon
+
+
+def run(coroutine, timeout=30):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, timeout))
+    finally:
+        loop.close()
+
+
+def test_list_containers(daemon):
+    async def list_containers():
+        async with AsyncDockerClient(daemon.socket_path) as client:
+            return await client.list_containers()
+
+    listing = run(list_containers())
+    assert [entry["Id"] for entry in listing] == list(daemon.containers)
+
+
+def test_list_containers_with_filters(daemon):
+    async def list_containers():
+        async with AsyncDockerClient(daemon.socket_path) as client:
+            return await client.list_containers(filters={"name": ["service-3"]})
+
+    listing = run(list_containers())
+    assert [entry["Names"] for entry in listing] == [["/service-3"]]
+
+
+def test_inspect_container_by_name_and_id(daemon):
+    container_id = list(daemon.containers)[2]
+
+    async def inspect():
+        async with AsyncDockerClient(daemon.socket_path) as client:
+            return (
+                await client.inspect_container("service-2"),
+                await client.inspect_container(container_id),
+            )
+
+    by_name, by_id = run(inspect())
+    assert by_name == by_id == daemon.containers[container_id]
+
+
+def test_inspect_missing_container(daemon):
+    async def inspect():
+        async with AsyncDockerClient(daemon.socket_path) as client:
+            with pytest.raises(ContainerNotFound) as excinfo:
+                await client.inspect_containers(["service-1", "missing", "service-2"])
+            # The connection is still usable after the error.
+            return excinfo.value, await client.inspect_container("service-4")
+
+    error, document = run(inspect())
+    assert error.status == 404
+    assert "missing" in error.message
+    assert document["Name"] == "/service-4"
+
+
+def test_events_stream(daemon):
+    container_id = list(daemon.containers)[0]
+
+    async def first_event():
+        events = AsyncDockerClient(daemon.socket_path).events()
+        received = asyncio.ensure_future(events.__anext__())
+        # The event must be emitted after the stream is connected, which the
+        # client can't observe, so keep emitting until one arrives.
+        while not received.done():
+            daemon.emit("start", container_id)
+            await asyncio.sleep(0.05)
+        await events.aclose()
+        return received.result()
+
+    event = run(first_event())
+    assert event["Action"] == "start"
+    assert event["Actor"]["ID"] == container_id
+
+
+@pytest.mark.parametrize("connections", [1, 4])
+def test_large_pipelined_batch(tmp_path, connections):
+    # Enough requests on one connection to fill the socket buffers in both
+    # directions if they were all written before reading any response.
+    socket_path = str(tmp_path / "docker.sock")
+    with FakeDockerDaemon(socket_path, containers=1500) as daemon:
+
+        async def inspect_all():
+            async with AsyncDockerClient(socket_path, connections) as client:
+                return await client.inspect_containers(list(daemon.containers))
+
+        documents = run(inspect_all(), timeout=60)
+    assert [document["Id"] for document in documents] == list(daemon.containers)
+    assert not os.path.exists(socket_path)
+
+
+@pytest.mark.parametrize("docker_host", ["tcp://10.0.0.1:2376", "ssh://user@host"])
+def test_remote_docker_host_is_rejected(monkeypatch, docker_host):
+    monkeypatch.setenv("DOCKER_HOST", docker_host)
+    with pytest.raises(BackendUnavailableError):
+        AsyncDockerClient()
+
+
+def test_default_socket_path(monkeypatch):
+    monkeypatch.delenv("DOCKER_HOST", raising=False)
+    assert AsyncDockerClient().socket_path == DEFAULT_SOCKET_PATH
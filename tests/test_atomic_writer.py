@@ -0,0 +1,80 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from docker_inspect2compose.cli import AtomicWriter
+
+
+def write(path, text, skip_if_unchanged=False):
+    with AtomicWriter(str(path), skip_if_unchanged) as f:
+        f.write(text)
+    return f.written
+
+
+def test_replaces_file_and_keeps_mode(tmp_path):
+    path = tmp_path / "compose.yml"
+    path.write_text("old\n")
+    os.chmod(path, 0o640)
+    assert write(path, "new\n")
+    assert path.read_text() == "new\n"
+    assert os.stat(path).st_mode & 0o7777 == 0o640
+    assert os.listdir(tmp_path) == ["compose.yml"]
+
+
+def test_skips_unchanged_content(tmp_path):
+    path = tmp_path / "compose.yml"
+    path.write_text("same\n")
+    mtime = os.stat(path).st_mtime_ns
+    assert not write(path, "same\n", skip_if_unchanged=True)
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_writes_through_symlink(tmp_path):
+    target_dir = tmp_path / "real"
+    target_dir.mkdir()
+    target = target_dir / "compose.yml"
+    target.write_text("old\n")
+    link = tmp_path / "compose.yml"
+    link.symlink_to(target)
+    assert write(link, "new\n")
+    assert link.is_symlink()
+    assert target.read_text() == "new\n"
+    assert os.listdir(target_dir) == ["compose.yml"]
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root to chown"
+)
+def test_keeps_owner(tmp_path):
+    path = tmp_path / "compose.yml"
+    path.write_text("old\n")
+    os.chown(path, 1234, 5678)
+    assert write(path, "new\n")
+    stat = os.stat(path)
+    assert (stat.st_uid, stat.st_gid) == (1234, 5678)
+
+
+def test_writes_fifo_directly(tmp_path):
+    path = tmp_path / "compose.fifo"
+    os.mkfifo(path)
+    received = []
+    reader = threading.Thread(target=lambda: received.append(path.read_text()))
+    reader.start()
+    assert write(path, "new\n", skip_if_unchanged=True)
+    reader.join(5)
+    assert received == ["new\n"]
+    assert stat.S_ISFIFO(os.stat(path).st_mode)
+    assert os.listdir(tmp_path) == ["compose.fifo"]
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root to mknod"
+)
+def test_writes_char_device_directly(tmp_path):
+    path = tmp_path / "null"
+    os.mknod(path, 0o666 | stat.S_IFCHR, os.makedev(1, 3))
+    assert write(path, "new\n", skip_if_unchanged=True)
+    assert stat.S_ISCHR(os.stat(path).st_mode)
+    assert os.listdir(tmp_path) == ["null"]
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+from synthetic import inspect_document
+
+from docker_inspect2compose.bulk import convert_many, output_path_for
+
+
+@pytest.mark.parametrize(
+    "input_path, expected",
+    [
+        ("dumps/web01.json", "out/web01.yml"),
+        ("dumps/web01.dc1.json", "out/web01.dc1.yml"),
+        ("dumps/web01.dc1.jsonl", "out/web01.dc1.yml"),
+        ("dumps/web01.ndjson", "out/web01.yml"),
+        ("dumps/web01.json.bak", "out/web01.json.bak.yml"),
+    ],
+)
+def test_output_path_for(input_path, expected):
+    assert output_path_for(input_path, "out") == expected
+
+
+def test_convert_many_keeps_dotted_hosts_apart(tmp_path):
+    paths = []
+    for index, name in enumerate(("web01.dc1.json", "web01.dc2.json")):
+        path = tmp_path / name
+        path.write_text(json.dumps([inspect_document(index)]))
+        paths.append(str(path))
+    output_dir = tmp_path / "out"
+    results = convert_many(paths, str(output_dir), jobs=1)
+    assert [count for _, count, _ in results] == [1, 1]
+    assert sorted(os.listdir(output_dir)) == ["web01.dc1.yml", "web01.dc2.yml"]
+
+
+def test_convert_many_rejects_colliding_outputs(tmp_path):
+    paths = [str(tmp_path / "web01.json"), str(tmp_path / "web01.jsonl")]
+    with pytest.raises(ValueError, match="web01.yml"):
+        convert_many(paths, str(tmp_path / "out"), jobs=1)
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+from docker_inspect2compose import cli
+from docker_inspect2compose.cli import Inspector, iter_cached_services
+
+
+def cached_services(path, ttl=None):
+    with Inspector("async") as inspector:
+        return list(iter_cached_services(path, False, inspector, ttl=ttl))
+
+
+def memory(services):
+    return [
+        service["services"][name]["deploy"]["resources"]["memory"]
+        for service in services
+        for name in service["services"]
+    ]
+
+
+def test_cache_hits_on_repeat_run(daemon, tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = cached_services(path)
+    # A change the listing can't show, without an event, stays cached.
+    container_id = list(daemon.containers)[1]
+    daemon.containers[container_id]["HostConfig"]["Memory"] = 1073741824
+    assert cached_services(path) == first
+
+
+def test_update_event_invalidates_entry(daemon, tmp_path):
+    path = str(tmp_path / "cache.db")
+    before = memory(cached_services(path))
+    container_id = list(daemon.containers)[1]
+    daemon.containers[container_id]["HostConfig"]["Memory"] = 1073741824
+    daemon.emit("update", container_id)
+    after = memory(cached_services(path))
+    assert after[0] == before[0] and after[2] == before[2]
+    assert after[1] != before[1]
+
+
+def test_expired_entries_are_reinspected(daemon, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cached_services(path)
+    container_id = list(daemon.containers)[0]
+    daemon.containers[container_id]["HostConfig"]["Memory"] = 1073741824
+    # No event, so only the TTL notices the change.
+    assert memory(cached_services(path))[0] == 536870912
+    assert memory(cached_services(path, ttl=0))[0] == 1073741824
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["service-0"], ["--from-json", "inspect.json"], ["--watch", "-o", "compose.yml"]],
+)
+def test_cache_rejected_where_unused(monkeypatch, capsys, args):
+    monkeypatch.setattr(sys, "argv", ["docker-inspect2compose", "--cache", "c.db", *args])
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main()
+    assert excinfo.value.code == 2
+    assert "--cache cannot be combined" in capsys.readouterr().err
@@ -0,0 +1,80 @@
+import json
+import sys
+
+import pytest
+from synthetic import inspect_document
+
+from docker_inspect2compose import cli
+
+
+@pytest.fixture
+def inspect_json(tmp_path):
+    path = tmp_path / "inspect.json"
+    path.write_text(json.dumps([inspect_document(0), inspect_document(1)]))
+    return str(path)
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["docker-inspect2compose", *args])
+    try:
+        cli.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def last_run_success(path):
+    with open(path) as f:
+        for line in f:
+            if line.startswith("docker_inspect2compose_last_run_success "):
+                return int(line.split()[1])
+
+
+def test_success(monkeypatch, tmp_path, inspect_json):
+    metrics = str(tmp_path / "run.prom")
+    output = str(tmp_path / "compose.yml")
+    args = ["--from-json", inspect_json, "-o", output, "--metrics-file", metrics]
+    assert run_cli(monkeypatch, *args) == 0
+    assert last_run_success(metrics) == 1
+
+
+def test_container_not_found(monkeypatch, tmp_path, inspect_json):
+    metrics = str(tmp_path / "run.prom")
+    args = ["--from-json", inspect_json, "missing", "--metrics-file", metrics]
+    assert run_cli(monkeypatch, *args) == 1
+    assert last_run_success(metrics) == 0
+
+
+def test_check_drift(monkeypatch, tmp_path, inspect_json):
+    metrics = str(tmp_path / "run.prom")
+    output = tmp_path / "compose.yml"
+    output.write_text("stale\n")
+    args = ["--from-json", inspect_json, "-o", str(output), "--check"]
+    assert run_cli(monkeypatch, *args, "--metrics-file", metrics) == 1
+    assert last_run_success(metrics) == 0
+    assert output.read_text() == "stale\n"
+
+
+def test_missing_sdk(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "DOCKER_SDK_AVAILABLE", False)
+    metrics = str(tmp_path / "run.prom")
+    assert run_cli(monkeypatch, "--backend", "sdk", "--metrics-file", metrics) == 1
+    assert last_run_success(metrics) == 0
+
+
+def test_missing_libyaml(monkeypatch, tmp_path, inspect_json):
+    import yaml
+
+    monkeypatch.setattr(yaml, "__with_libyaml__", False)
+    metrics = str(tmp_path / "run.prom")
+    args = ["--from-json", inspect_json, "--yaml-backend", "c"]
+    assert run_cli(monkeypatch, *args, "--metrics-file", metrics) == 1
+    assert last_run_success(metrics) == 0
+
+
+@pytest.mark.parametrize("option", [["--all"], ["--filter", "label=a=b"]])
+def test_listing_options_rejected_with_from_json(
+    monkeypatch, capsys, inspect_json, option
+):
+    assert run_cli(monkeypatch, "--from-json", inspect_json, *option) == 2
+    assert "cannot be used with --from-json" in capsys.readouterr().err
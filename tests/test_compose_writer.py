@@ -0,0 +1,137 @@
+import io
+import logging
+
+import pytest
+
+import yaml
+from synthetic import inspect_document
+
+from docker_inspect2compose.cli import merge_compose, transform_to_compose
+from docker_inspect2compose.compose_writer import (
+    ComposeFile,
+    StreamingComposeWriter,
+    dump_compose,
+    load_compose,
+)
+
+BACKENDS = [
+    "python",
+    pytest.param(
+        "c",
+        marks=pytest.mark.skipif(
+            not getattr(yaml, "__with_libyaml__", False), reason="needs libyaml"
+        ),
+    ),
+    "auto",
+]
+
+
+def test_streaming_writer_keeps_first_duplicate_service(caplog):
+    stream = io.StringIO()
+    with caplog.at_level(logging.WARNING):
+        with StreamingComposeWriter(stream, backend="python") as writer:
+            assert writer.add_service("web", {"image": "web:1"})
+            assert not writer.add_service("web", {"image": "web:2"})
+    assert "web:1" in stream.getvalue()
+    assert "web:2" not in stream.getvalue()
+    assert "duplicate service 'web'" in caplog.text
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_streaming_writer_matches_dump_compose(backend):
+    composes = [
+        transform_to_compose(f"service-{i}", inspect_document(i), False)
+        for i in range(5)
+    ]
+    # Values that need quoting, escaping, folding or flow style.
+    composes.append(
+        {
+            "services": {
+                "odd": {
+                    "image": "on",
+                    "command": "line one\nline two",
+                    "labels": {"yes": "0123", "empty": "", "unicode": "caf\u00e9"},
+                    "environment": ["A=" + "x" * 200],
+                    "ports": [],
+                    "healthcheck": {},
+                    "user": None,
+                }
+            }
+        }
+    )
+    batch = io.StringIO()
+    dump_compose(
+        {
+            "version": "3.8",
+            "services": {
+                name: service
+                for compose in composes
+                for name, service in compose["services"].items()
+            },
+        },
+        batch,
+        backend,
+    )
+    streamed = io.StringIO()
+    with StreamingComposeWriter(streamed, backend=backend) as writer:
+        for compose in composes:
+            writer.add(compose)
+    assert streamed.getvalue() == batch.getvalue()
+
+
+def render_merged(text, new_services, strategy, backend="python"):
+    compose_file = ComposeFile(text, backend)
+    merge_compose(compose_file.data, [{"services": new_services}], strategy)
+    return compose_file.render()
+
+
+def test_render_rewrites_only_changed_services():
+    text = (
+        "version: '3.8'\n"
+        "services:\n"
+        "  # the web tier\n"
+        "  web:\n"
+        "    image: web:1  # pinned\n"
+        "  db:\n"
+        "    image: db:1\n"
+    )
+    rendered = render_merged(text, {"db": {"image": "db:2"}}, "replace")
+    assert rendered == text.replace("db:1", "db:2")
+
+
+@pytest.mark.parametrize("strategy", ["replace", "deep"])
+@pytest.mark.parametrize("backend", ["python", "auto"])
+def test_render_with_anchors_stays_valid(strategy, backend):
+    text = (
+        "version: '3.8'\n"
+        "services:\n"
+        "  base: &base\n"
+        "    image: base:1\n"
+        "    restart: always\n"
+        "  web:\n"
+        "    <<: *base\n"
+        "    image: web:1\n"
+    )
+    rendered = render_merged(text, {"base": {"image": "base:2"}}, strategy, backend)
+    services = load_compose(io.StringIO(rendered))["services"]
+    assert services["base"]["image"] == "base:2"
+    assert services["web"] == {"image": "web:1", "restart": "always"}
+
+
+@pytest.mark.parametrize("backend", ["python", "auto"])
+def test_render_keeps_document_end_marker_last(backend):
+    text = (
+        "---\n"
+        "services:\n"
+        "  web:\n"
+        "    image: web:1\n"
+        "  db:\n"
+        "    image: db:1\n"
+        "...\n"
+        "# end of file\n"
+    )
+    new_services = {"db": {"image": "db:2"}, "cache": {"image": "cache:1"}}
+    rendered = render_merged(text, new_services, "replace", backend)
+    assert rendered == text.replace(
+        "    image: db:1\n", "    image: db:2\n  cache:\n    image: cache:1\n"
+    )
@@ -0,0 +1,77 @@
+import json
+import re
+
+import pytest
+from synthetic import inspect_document
+
+from docker_inspect2compose.cli import inspect_template, transform_to_compose
+from docker_inspect2compose.models import INSPECT_FIELDS
+
+ACTION = re.compile(r"json (?:\.\w+)+")
+
+
+def lex(template):
+    # Splits a Go template into ("text", ...) and ("action", ...) items the
+    # way text/template does: an action opens at the first "{{" and closes at
+    # the first "}}" after it.
+    items = []
+    position = 0
+    while True:
+        start = template.find("{{", position)
+        if start < 0:
+            items.append(("text", template[position:]))
+            return items
+        items.append(("text", template[position:start]))
+        end = template.find("}}", start + 2)
+        assert end >= 0, f"unclosed action at {start}"
+        items.append(("action", template[start + 2 : end]))
+        position = end + 2
+
+
+def lookup(document, path):
+    value = document
+    for key in path.strip(".").split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def leaf_paths(fields, path=""):
+    paths = []
+    for key, value in fields.items():
+        if value is None:
+            paths.append(f"{path}.{key}")
+        else:
+            paths.extend(leaf_paths(value, f"{path}.{key}"))
+    return paths
+
+
+def render(template, document):
+    # What `docker inspect --format` prints for `document`.
+    out = []
+    for kind, value in lex(template):
+        if kind == "text":
+            out.append(value)
+        else:
+            assert ACTION.fullmatch(value), f"unexpected action {value!r}"
+            out.append(json.dumps(lookup(document, value.split(" ", 1)[1])))
+    return "".join(out)
+
+
+def test_template_actions_are_well_formed():
+    # Runs of braces where a nested object ends next to an action must not
+    # open or close an action early.
+    items = lex(inspect_template(INSPECT_FIELDS))
+    actions = [value for kind, value in items if kind == "action"]
+    assert actions == [f"json {path}" for path in leaf_paths(INSPECT_FIELDS)]
+    assert all("{{" not in value for kind, value in items if kind == "text")
+
+
+@pytest.mark.parametrize("index", [0, 1, 7])
+@pytest.mark.parametrize("include_path_env", [False, True])
+def test_projected_document_transforms_like_full_document(index, include_path_env):
+    document = inspect_document(index)
+    projected = json.loads(render(inspect_template(INSPECT_FIELDS), document))
+    name = document["Name"].lstrip("/")
+    assert transform_to_compose(name, projected, include_path_env) == (
+        transform_to_compose(name, document, include_path_env)
+    )
@@ -0,0 +1,75 @@
+import gc
+import warnings
+
+import pytest
+from fake_docker import FakeDockerDaemon
+
+from docker_inspect2compose import stats
+from docker_inspect2compose.cli import ContainerNotFoundError, Inspector
+
+LABEL = {"label": ["com.example.label-0=value-0-0"]}
+
+
+def names(documents):
+    return [document["Name"] for document in documents]
+
+
+def test_single_container_with_filters(daemon):
+    with Inspector("async") as inspector:
+        assert names(inspector.get_container_info(["service-0"], filters=LABEL)) == [
+            "/service-0"
+        ]
+        with pytest.raises(ContainerNotFoundError):
+            inspector.get_container_info(["service-1"], filters=LABEL)
+
+
+def test_glob_and_names(daemon):
+    with Inspector("async") as inspector:
+        documents = inspector.get_container_info(["service-2", "service-*"])
+    assert names(documents) == ["/service-2", "/service-0", "/service-1"]
+
+
+def test_globs_skip_stopped_containers_without_all(daemon):
+    daemon.exit_container(list(daemon.containers)[1])
+    with Inspector("async") as inspector:
+        assert names(inspector.get_container_info(["service-*"])) == [
+            "/service-0",
+            "/service-2",
+        ]
+        assert names(inspector.get_container_info(["service-*"], all=True)) == [
+            "/service-0",
+            "/service-1",
+            "/service-2",
+        ]
+        # A name matches whatever the state, alongside a glob or not.
+        assert names(inspector.get_container_info(["service-1", "service-*"])) == [
+            "/service-1",
+            "/service-0",
+            "/service-2",
+        ]
+        assert names(inspector.get_container_info(["service-1"])) == ["/service-1"]
+
+
+def test_async_close_releases_connections(daemon):
+    inspector = Inspector("async", jobs=2)
+    assert len(list(inspector.iter_inspect(list(daemon.containers)))) == 3
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        inspector.close()
+        gc.collect()
+    assert [w for w in caught if issubclass(w.category, ResourceWarning)] == []
+
+
+def test_async_inspect_latency_is_per_request(tmp_path, monkeypatch):
+    # Each request is delayed by the daemon, so every sample includes the
+    # delay even though the batch's later documents arrive without a wait.
+    monkeypatch.setattr(stats, "_active", None)
+    run_stats = stats.enable()
+    socket_path = str(tmp_path / "slow.sock")
+    with FakeDockerDaemon(socket_path, containers=3, latency=0.05) as daemon:
+        monkeypatch.setenv("DOCKER_HOST", daemon.docker_host)
+        with Inspector("async", jobs=1) as inspector:
+            assert len(list(inspector.iter_inspect(list(daemon.containers)))) == 3
+    latencies = run_stats.latencies["inspect"]
+    assert len(latencies) == 3
+    assert min(latencies) >= 0.05
@@ -0,0 +1,33 @@
+from docker_inspect2compose.cli import deep_merge, merge_compose
+
+
+def test_deep_merge_environment_mapping():
+    existing = {"image": "web:1", "environment": {"A": 1, "B": "old", "C": None}}
+    new = {"image": "web:2", "environment": ["B=new", "D=4"]}
+    assert deep_merge(existing, new) == {
+        "image": "web:2",
+        "environment": ["A=1", "B=new", "C", "D=4"],
+    }
+
+
+def test_deep_merge_environment_list():
+    merged = deep_merge({"environment": ["A=1", "B=2"]}, {"environment": ["B=3"]})
+    assert merged == {"environment": ["A=1", "B=3"]}
+
+
+def test_merge_compose_strategies():
+    def compose():
+        return {"services": {"web": {"ports": ["80:80"], "environment": {"A": True}}}}
+
+    new = [{"services": {"web": {"ports": ["81:81"]}, "db": {"image": "db"}}}]
+    assert merge_compose(compose(), new, "add")["services"] == {
+        "web": {"ports": ["80:80"], "environment": {"A": True}},
+        "db": {"image": "db"},
+    }
+    assert merge_compose(compose(), new, "replace")["services"]["web"] == {
+        "ports": ["81:81"]
+    }
+    assert merge_compose(compose(), new, "deep")["services"]["web"] == {
+        "ports": ["80:80", "81:81"],
+        "environment": {"A": True},
+    }
@@ -0,0 +1,21 @@
+import pstats
+
+import pytest
+
+from docker_inspect2compose.profiling import profile_call, report_path
+
+
+@pytest.mark.parametrize(
+    "profile_path, expected",
+    [("out.prof", "out.txt"), ("out", "out.txt"), ("run.txt", "run.txt.txt")],
+)
+def test_report_path(profile_path, expected):
+    assert report_path(profile_path) == expected
+
+
+def test_profile_call_keeps_raw_profile(tmp_path):
+    profile_path = str(tmp_path / "run.txt")
+    assert profile_call(lambda: sum(range(10)), profile_path) == 45
+    pstats.Stats(profile_path)
+    with open(report_path(profile_path)) as f:
+        assert f.read().startswith("Top 30 functions")
@@ -0,0 +1,48 @@
+import pytest
+
+from docker_inspect2compose.cli import (
+    AmbiguousContainerError,
+    ContainerNotFoundError,
+    resolve_containers,
+    select_containers,
+)
+
+WEB = {"Id": "db" + "1" * 62, "Name": "/web"}
+DB = {"Id": "ab" + "2" * 62, "Name": "/db"}
+CACHE = {"Id": "ab" + "3" * 62, "Name": "/cache"}
+DOCUMENTS = [WEB, DB, CACHE]
+LISTING = [{"Id": d["Id"], "Names": [d["Name"]]} for d in DOCUMENTS]
+
+
+def select(patterns):
+    return [d["Name"] for d in select_containers(iter(DOCUMENTS), patterns)]
+
+
+def test_name_wins_over_id_prefix():
+    assert resolve_containers(["db", "cache"], LISTING) == [DB["Id"], CACHE["Id"]]
+    assert select(["db", "cache"]) == ["/db", "/cache"]
+
+
+def test_unique_id_prefix():
+    assert resolve_containers(["db1"], LISTING) == [WEB["Id"]]
+    assert select(["db1", "cache"]) == ["/web", "/cache"]
+
+
+def test_full_id_and_glob():
+    assert resolve_containers([CACHE["Id"], "w*"], LISTING) == [CACHE["Id"], WEB["Id"]]
+    assert select([CACHE["Id"], "w*"]) == ["/web", "/cache"]
+
+
+def test_ambiguous_id_prefix():
+    with pytest.raises(AmbiguousContainerError):
+        resolve_containers(["ab"], LISTING)
+    with pytest.raises(AmbiguousContainerError):
+        select(["ab"])
+
+
+@pytest.mark.parametrize("pattern", ["missing", "x*"])
+def test_unmatched_pattern(pattern):
+    with pytest.raises(ContainerNotFoundError):
+        resolve_containers(["web", pattern], LISTING)
+    with pytest.raises(ContainerNotFoundError):
+        select(["web", pattern])
@@ -0,0 +1,102 @@
+import os
+import subprocess
+
+import pytest
+import yaml
+from synthetic import inspect_document
+
+from docker_inspect2compose import watch
+from docker_inspect2compose.cli import Inspector
+from docker_inspect2compose.watch import ComposeWatcher, EventStreamEndedError
+
+
+@pytest.fixture
+def watcher(daemon, tmp_path):
+    with Inspector("async") as inspector:
+        watcher = ComposeWatcher(str(tmp_path / "compose.yml"), inspector=inspector)
+        watcher.run(events=[])
+        yield watcher
+
+
+def event(action, container_id):
+    return {"Type": "container", "Action": action, "Actor": {"ID": container_id}}
+
+
+def services(watcher):
+    with open(watcher.output) as f:
+        return list(yaml.safe_load(f)["services"])
+
+
+def test_run_writes_initial_services(watcher):
+    assert services(watcher) == ["service-0", "service-1", "service-2"]
+
+
+def test_create(daemon, watcher):
+    document = inspect_document(3)
+    daemon.containers[document["Id"]] = document
+    assert watcher.handle(event("create", document["Id"]))
+    assert services(watcher) == ["service-0", "service-1", "service-2", "service-3"]
+
+
+def test_die(daemon, watcher):
+    container_id = list(daemon.containers)[1]
+    daemon.containers[container_id]["State"]["Running"] = False
+    assert watcher.handle(event("die", container_id))
+    assert services(watcher) == ["service-0", "service-2"]
+
+
+def test_destroy(daemon, watcher):
+    container_id = list(daemon.containers)[0]
+    del daemon.containers[container_id]
+    assert watcher.handle(event("destroy", container_id))
+    assert services(watcher) == ["service-1", "service-2"]
+
+
+def test_rename(daemon, watcher):
+    container_id = list(daemon.containers)[2]
+    daemon.containers[container_id]["Name"] = "/renamed"
+    assert watcher.handle(event("rename", container_id))
+    assert services(watcher) == ["service-0", "service-1", "renamed"]
+
+
+def test_unchanged_service_does_not_rewrite(daemon, watcher):
+    before = os.stat(watcher.output)
+    container_id = list(daemon.containers)[0]
+    assert not watcher.handle(event("start", container_id))
+    after = os.stat(watcher.output)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_run_handles_events_in_order(daemon, tmp_path):
+    ids = list(daemon.containers)
+    del daemon.containers[ids[0]]
+    daemon.containers[ids[1]]["Name"] = "/renamed"
+    events = [
+        event("destroy", ids[0]),
+        event("rename", ids[1]),
+        {"Type": "network", "Action": "connect", "Actor": {"ID": "n"}},
+    ]
+    with Inspector("async") as inspector:
+        # The initial sync already sees both changes, so the events that
+        # follow leave the file alone.
+        watcher = ComposeWatcher(str(tmp_path / "compose.yml"), inspector=inspector)
+        watcher.run(events=iter(events))
+    assert services(watcher) == ["renamed", "service-2"]
+
+
+def test_run_fails_when_event_stream_ends(daemon, tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, "iter_events", lambda inspector, since: iter([]))
+    with Inspector("async") as inspector:
+        watcher = ComposeWatcher(str(tmp_path / "compose.yml"), inspector=inspector)
+        with pytest.raises(EventStreamEndedError):
+            watcher.run()
+    assert services(watcher) == ["service-0", "service-1", "service-2"]
+
+
+def test_cli_event_stream_failure_raises(tmp_path, monkeypatch):
+    bin_dir = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bin")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("DOCKER_HOST", f"unix://{tmp_path / 'missing.sock'}")
+    with Inspector("cli") as inspector:
+        with pytest.raises(subprocess.CalledProcessError):
+            list(inspector.iter_events(since=0))